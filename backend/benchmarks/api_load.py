@@ -0,0 +1,152 @@
+"""
+Load scenarios against a running API, logged in as seeded bench users.
+
+Each scenario sends --requests requests from --concurrency concurrent
+clients and records latencies, errors and throughput.
+
+Run from the backend directory, after benchmarks.seed:
+    python -m benchmarks.api_load --base-url http://localhost:8000 \
+        --scenario list_incomes --scenario add_expense --requests 2000
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from datetime import date
+
+import httpx
+
+from benchmarks.results import summarize, write_results
+from benchmarks.seed import EXPENSE_CATEGORIES, INCOME_CATEGORIES, PASSWORD, bench_email
+
+
+def new_income(rng):
+    return {"date": date.today().isoformat(), "income_category": rng.choice(INCOME_CATEGORIES),
+            "description": "load test", "total": round(rng.uniform(1000, 50000), 2)}
+
+
+def new_expense(rng):
+    return {"date": date.today().isoformat(), "expense_category": rng.choice(EXPENSE_CATEGORIES),
+            "description": "load test", "total": round(rng.uniform(100, 5000), 2), "tax": 0}
+
+
+# Each scenario does any untimed setup and returns the (method, url, options)
+# of the request to time
+
+async def list_incomes(client, headers, rng):
+    return "GET", "/income/get_incomes", {"params": {"limit": 100}}
+
+
+async def list_expenses(client, headers, rng):
+    return "GET", "/expense/get_expenses", {"params": {"limit": 100}}
+
+
+async def list_receipts(client, headers, rng):
+    return "GET", "/receipt/get_receipts", {"params": {"limit": 100}}
+
+
+async def sync_page(client, headers, rng):
+    return "GET", "/sync", {"params": {"limit": 100}}
+
+
+async def add_income(client, headers, rng):
+    return "POST", "/income/add_income", {"json": new_income(rng)}
+
+
+async def add_expense(client, headers, rng):
+    return "POST", "/expense/add_expense", {"json": new_expense(rng)}
+
+
+async def delete_income(client, headers, rng):
+    created = await client.post("/income/add_income", json=new_income(rng), headers=headers)
+    created.raise_for_status()
+    return "DELETE", f"/income/delete_income/{created.json()['id']}", {}
+
+
+async def tax_form(client, headers, rng):
+    return "GET", "/form/generate_tax_forms", {}
+
+
+SCENARIOS = {scenario.__name__: scenario for scenario in (
+    list_incomes, list_expenses, list_receipts, sync_page, add_income, add_expense,
+    delete_income, tax_form)}
+
+
+async def login(client, users):
+    headers = []
+    for number in range(users):
+        response = await client.post(
+            "/auth/login", json={"email": bench_email(number), "password": PASSWORD})
+        response.raise_for_status()
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+async def run_scenario(client, scenario, user_headers, requests, concurrency, seed):
+    latencies, errors = [], 0
+    counter = itertools.count()
+    rng = random.Random(seed)
+
+    async def worker():
+        nonlocal errors
+        while (index := next(counter)) < requests:
+            headers = user_headers[index % len(user_headers)]
+            try:
+                method, url, options = await scenario(client, headers, rng)
+                start = time.perf_counter()
+                response = await client.request(method, url, headers=headers, **options)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {**summarize(latencies), "errors": errors,
+            "requests_per_s": requests / elapsed if elapsed else None}
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        user_headers = await login(client, args.users)
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}")
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], user_headers, args.requests,
+                args.concurrency, args.seed)
+            print(f"  p50={results[name].get('p50_ms', 0):.1f}ms "
+                  f"p95={results[name].get('p95_ms', 0):.1f}ms errors={results[name]['errors']}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        choices=sorted(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=10, help="seeded users to spread load over")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    results = asyncio.run(run(args))
+    write_results("api_load", {
+        key: getattr(args, key) for key in
+        ("base_url", "scenarios", "requests", "concurrency", "users", "seed")},
+        results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Compares two benchmark result files, scenario by scenario.
+
+Run from the backend directory:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(baseline, candidate, threshold):
+    """Prints the change of each latency metric; returns the regressions."""
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = candidate["results"].get(name)
+        if new is None:
+            print(f"{name}: missing from candidate")
+            continue
+        changes = []
+        for metric in METRICS:
+            if not old.get(metric) or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            changes.append(f"{metric} {old[metric]:.1f} -> {new[metric]:.1f} ({change:+.1f}%)")
+            if metric == "p50_ms" and change > threshold:
+                regressions.append(name)
+        print(f"{name}: " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="p50 slowdown, in percent, that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        print("Results are from different benchmarks", file=sys.stderr)
+        return 2
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
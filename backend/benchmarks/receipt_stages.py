@@ -0,0 +1,88 @@
+"""
+Micro-benchmarks the receipt extraction stages on sample images.
+
+Stage times come from the same stage timers that feed /metrics: image
+decode, OCR/processor, forward pass, token merge and field extraction.
+
+Run from the backend directory:
+    python -m benchmarks.receipt_stages img.jpg --backend int8 --iterations 20
+"""
+
+import argparse
+import sys
+import time
+
+import pytesseract
+
+from benchmarks.results import summarize, write_results
+from config import MODEL_PATH, RECEIPT_MAX_IMAGE_SIDE, TESSERACT_CMD
+from metrics import STAGE_SECONDS, stage_timer
+from models.extract_receipt_data import BACKENDS, ReceiptInformationExtractor
+from models.receipt_image import load_receipt_image
+
+
+def stage_totals():
+    """Seconds recorded so far for each stage."""
+    return {dict(labels)["stage"]: value for name, labels, value in STAGE_SECONDS.samples()
+            if name.endswith("_sum")}
+
+
+def run_once(extractor, contents, batch_size):
+    """
+    Decodes every image and extracts ``batch_size`` copies of each in one
+    batch; returns seconds per stage.
+    """
+    before = stage_totals()
+    start = time.perf_counter()
+    decoded = []
+    for payload in contents:
+        with stage_timer("decode"):
+            decoded.append(load_receipt_image(payload, RECEIPT_MAX_IMAGE_SIDE))
+    decoded = decoded * batch_size
+    extractor.extract_batch([image for image, _ in decoded], [size for _, size in decoded])
+    elapsed = time.perf_counter() - start
+
+    after = stage_totals()
+    return {**{stage: after[stage] - before.get(stage, 0.0) for stage in after},
+            "total": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*", default=["img.jpg"])
+    parser.add_argument("--backend", choices=BACKENDS, default="eager")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="copies of each image per batch")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    contents = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+
+    extractor = ReceiptInformationExtractor(MODEL_PATH, args.backend)
+    for _ in range(args.warmup):
+        run_once(extractor, contents, args.batch_size)
+
+    samples = {}
+    for iteration in range(args.iterations):
+        for stage, seconds in run_once(extractor, contents, args.batch_size).items():
+            samples.setdefault(stage, []).append(seconds)
+        print(f"[{iteration + 1}/{args.iterations}] {samples['total'][-1] * 1000:.0f}ms")
+
+    results = {stage: summarize(seconds) for stage, seconds in samples.items()}
+    for stage, summary in results.items():
+        print(f"{stage:>18}: p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms")
+    write_results("receipt_stages", {
+        "images": args.images, "backend": args.backend, "iterations": args.iterations,
+        "warmup": args.warmup, "batch_size": args.batch_size}, results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
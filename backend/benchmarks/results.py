@@ -0,0 +1,69 @@
+"""Machine-readable benchmark results, comparable across runs"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(seconds):
+    """Latency summary, in milliseconds, of a list of durations in seconds."""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(value * 1000 for value in seconds)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def write_results(benchmark, parameters, results, output=None):
+    """
+    Writes one run as JSON (to ``output`` or benchmarks/results/) with the
+    commit and machine it ran on, and returns the file path.
+    """
+    started_at = datetime.now(timezone.utc)
+    document = {
+        "benchmark": benchmark,
+        "started_at": started_at.isoformat(),
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": parameters,
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"{benchmark}-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+    return output
@@ -0,0 +1,147 @@
+"""
+Fills the database with synthetic users, incomes, expenses and receipts.
+
+Seeded users are bench-<n>@example.com with the password "benchmark". Rows
+are generated deterministically from --seed and --start-date, whatever day
+the seeder runs, and inserted in chunks, one transaction per user, so
+millions of rows never sit in memory at once.
+
+Run from the backend directory against a migrated database, e.g.:
+    DATABASE_URL=sqlite:///bench.sqlite3 python migrate.py
+    DATABASE_URL=sqlite:///bench.sqlite3 python -m benchmarks.seed --users 1000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from database import engine
+from models.change_feed_model import LedgerChange, enter_ledger
+from models.collection_version_model import CollectionVersion
+from models.expense_model import Expense
+from models.income_model import Income
+from models.receipt_model import Receipt
+from models.rollup_model import LedgerRollup
+from models.user import User
+from password_hashing import hash_password
+from scripts.ledger_rollups import rebuild
+
+PASSWORD = "benchmark"
+INCOME_CATEGORIES = ["Salary", "Freelance", "Rental", "Investment"]
+EXPENSE_CATEGORIES = [
+    "Rent", "Electricity", "Water", "Gas", "Telephone", "Medical",
+    "Educational", "Travelling", "Vehicle Running / Maintenance",
+    "Other Personal / Household Expenses", "Groceries",
+]
+VENDORS = ["Metro", "Imtiaz", "Shell", "PSO", "Naheed", "Chase Up", "Agha's"]
+
+
+def bench_email(number):
+    return f"bench-{number}@example.com"
+
+
+def random_day(rng, first_day, days):
+    return first_day + timedelta(days=rng.randrange(days))
+
+
+def insert_returning_ids(connection, table, id_column, rows):
+    return connection.execute(insert(table).values(rows).returning(id_column)).scalars().all()
+
+
+def seed_user(connection, rng, user_id, args, first_day, days):
+    """Inserts one user's ledger; returns the number of rows inserted."""
+    for start in range(0, args.incomes_per_user, args.chunk_size):
+        count = min(args.chunk_size, args.incomes_per_user - start)
+        connection.execute(insert(Income), [{
+            "user_id": user_id,
+            "date": random_day(rng, first_day, days),
+            "income_category": rng.choice(INCOME_CATEGORIES),
+            "description": "synthetic income",
+            "total": round(rng.uniform(1000, 250000), 2),
+        } for _ in range(count)])
+
+    receipts = 0
+    for start in range(0, args.expenses_per_user, args.chunk_size):
+        count = min(args.chunk_size, args.expenses_per_user - start)
+        expenses = []
+        for _ in range(count):
+            total = round(rng.uniform(100, 50000), 2)
+            expenses.append({
+                "user_id": user_id,
+                "date": random_day(rng, first_day, days),
+                "expense_category": rng.choice(EXPENSE_CATEGORIES),
+                "description": "synthetic expense",
+                "total": total,
+                "tax": round(total * rng.choice((0, 0.05, 0.17)), 2),
+            })
+        expense_ids = insert_returning_ids(connection, Expense, Expense.id, expenses)
+
+        receipt_rows = [{
+            "user_id": user_id,
+            "expense_id": expense_id,
+            "date_uploaded": expense["date"],
+            "vendor_name": rng.choice(VENDORS),
+            "total_amount": expense["total"],
+        } for expense_id, expense in zip(expense_ids, expenses)
+            if rng.random() < args.receipt_ratio]
+        if receipt_rows:
+            connection.execute(insert(Receipt), receipt_rows)
+        receipts += len(receipt_rows)
+
+    return args.incomes_per_user + args.expenses_per_user + receipts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--incomes-per-user", type=int, default=200)
+    parser.add_argument("--expenses-per-user", type=int, default=1000)
+    parser.add_argument("--receipt-ratio", type=float, default=0.3,
+                        help="share of expenses that get a receipt")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2023, 1, 1),
+                        help="first day of the seeded ledgers (YYYY-MM-DD)")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--reset", action="store_true",
+                        help="delete previously seeded bench users first")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    days = 365 * args.years
+    first_day = args.start_date
+    password = asyncio.run(hash_password(PASSWORD))
+
+    if args.reset:
+        with engine.begin() as connection:
+            user_ids = select(User.id).where(User.email.like("bench-%@example.com"))
+            for table in (Receipt, Expense, Income, LedgerRollup, LedgerChange,
+                          CollectionVersion):
+                connection.execute(delete(table).where(table.user_id.in_(user_ids)))
+            connection.execute(delete(User).where(User.email.like("bench-%@example.com")))
+
+    start, rows = time.perf_counter(), 0
+    for number in range(args.users):
+        with engine.begin() as connection:
+            user_id = connection.scalar(insert(User).values(
+                email=bench_email(number), name=f"Bench User {number}",
+                password=password).returning(User.id))
+            rows += seed_user(connection, rng, user_id, args, first_day, days)
+            enter_ledger(connection, user_id)
+        if (number + 1) % 10 == 0 or number + 1 == args.users:
+            elapsed = time.perf_counter() - start
+            print(f"[{number + 1}/{args.users}] users, {rows} rows, {rows / elapsed:.0f} rows/s")
+
+    print("Rebuilding ledger rollups")
+    with engine.begin() as connection:
+        rebuild(connection)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Negotiated brotli / gzip compression of large text and JSON responses"""
+
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pinned in requirements.txt; without it, only gzip is served
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson")
+
+
+def choose_encoding(accept_encoding):
+    """Picks "br" (when installed) or "gzip" from an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def compress(self, data):
+        return self._compress(data) if data else b""
+
+    def finish(self):
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses text, JSON and NDJSON responses for clients that accept it,
+    preferring brotli over gzip. Whole bodies under ``minimum_size`` bytes
+    are sent as they are; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or compressor is not None:
+                if compressor is None:
+                    await send(message)
+                    return
+                more_body = message.get("more_body", False)
+                data = compressor.compress(message.get("body", b""))
+                if not more_body:
+                    data += compressor.finish()
+                await send({"type": "http.response.body", "body": data,
+                            "more_body": more_body})
+                return
+
+            # First message after the headers: decide whether to compress
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            content_type = headers.get("content-type", "")
+            if (message["type"] != "http.response.body"
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            # The encoded bytes differ from the identity ones, so a strong
+            # validator no longer holds; If-None-Match compares weakly anyway
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            data = compressor.compress(body)
+            if more_body:
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+            else:
+                data += compressor.finish()
+                headers["Content-Length"] = str(len(data))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": data,
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
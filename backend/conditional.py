@@ -0,0 +1,42 @@
+"""ETag / If-None-Match handling for the ledger list endpoints"""
+
+import hashlib
+from fastapi import Response
+from models.collection_version_model import get_version
+
+
+def collection_etag(user_id, collection, version, query_params) -> str:
+    """
+    Weak ETag of one listing: the collection's version plus the query
+    (page size, cursor, filters) that selected the rows. Weak because it
+    tracks the data, not the bytes of any one (compressed) encoding.
+    """
+    query = "&".join(f"{key}={value}" for key, value in sorted(query_params.multi_items()))
+    digest = hashlib.sha256(f"{user_id}|{collection}|{version}|{query}".encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag) -> bool:
+    """Weak comparison, as If-None-Match requires (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque
+               for tag in if_none_match.split(","))
+
+
+async def not_modified_response(request, response, db, user_id, collection):
+    """
+    Looks up the collection's version and returns a 304 response when the
+    client's If-None-Match still matches, without running the list query.
+    Otherwise sets the ETag on ``response`` and returns None.
+    """
+    version = await get_version(db, user_id, collection)
+    etag = collection_etag(user_id, collection, version, request.query_params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,11 +1,17 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import TOKEN_IDENTITY_CLAIMS, USER_CACHE_SIZE, USER_CACHE_TTL_S
+from database import get_async_db
+from models.collection_version_model import PROFILE, get_version
 from models.user import User
 
 SECRET_KEY = "your_secret_key_here"
@@ -16,6 +22,81 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+class UserIdentityCache:
+    """
+    TTL'd, size-bounded map of user id to something read about that user,
+    such as its identity fields (id, email, name), so authenticated
+    requests can skip the query.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def put(self, user_id, identity):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserIdentityCache(USER_CACHE_TTL_S, USER_CACHE_SIZE)
+# Profile versions, shared by every worker through collection_versions
+profile_versions = UserIdentityCache(USER_CACHE_TTL_S, USER_CACHE_SIZE)
+
+
+async def identity_claims(user: User, db: AsyncSession) -> dict:
+    """
+    Claims to put in a user's access token. Identity claims carry the
+    profile version they were read at, and are trusted only while it is
+    still current.
+    """
+    claims = {"user_id": user.id}
+    if TOKEN_IDENTITY_CLAIMS:
+        claims.update(email=user.email, name=user.name,
+                      profile_version=await get_version(db, user.id, PROFILE))
+    return claims
+
+
+async def current_profile_version(user_id: int, db: AsyncSession) -> int:
+    version = profile_versions.get(user_id)
+    if version is None:
+        version = await get_version(db, user_id, PROFILE)
+        profile_versions.put(user_id, version)
+    return version
+
+
+def invalidate_cached_user(user_id: int):
+    """
+    Drops a user's cached identity and profile version after their
+    profile changed. Other workers notice the new profile version within
+    USER_CACHE_TTL_S.
+    """
+    user_cache.invalidate(user_id)
+    profile_versions.invalidate(user_id)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Generate a JWT access token."""
     to_encode = data.copy()
@@ -24,37 +105,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + \
             timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_access_token(token: str) -> int:
+def decode_access_token(token: str) -> dict:
     """
-    Decode the JWT token and return the user_id.
-    Raise an exception if token is invalid.
+    Decode the JWT token and return its claims.
+    Raise an exception if token is invalid or has no user_id.
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
+        if payload.get("user_id") is None:
             raise JWTError("Missing user_id")
-        return user_id
+        return payload
     except JWTError as e:
         raise JWTError("Could not validate credentials") from e
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Retrieve the current user based on the JWT token."""
+def verify_access_token(token: str) -> int:
+    """
+    Decode the JWT token and return the user_id.
+    Raise an exception if token is invalid.
+    """
+    return decode_access_token(token)["user_id"]
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    """
+    Retrieve the current user based on the JWT token.
+
+    Served from identity claims in the token or from the user cache when
+    possible; those users are detached snapshots holding only id, email
+    and name, so routes that modify the user must load it in their own session.
+    """
     try:
-        user_id = verify_access_token(token)
+        payload = decode_access_token(token)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.id == user_id).first()
+    user_id = payload["user_id"]
+
+    if (TOKEN_IDENTITY_CLAIMS and "profile_version" in payload
+            and payload["profile_version"] == await current_profile_version(user_id, db)):
+        return User(id=user_id, email=payload["email"], name=payload["name"])
+
+    identity = user_cache.get(user_id)
+    if identity is not None:
+        return User(**identity)
+
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.put(user_id, {"id": user.id, "email": user.email, "name": user.name})
     return user
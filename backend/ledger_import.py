@@ -0,0 +1,150 @@
+"""Streaming parsing and validation of bulk ledger imports (CSV or JSON)"""
+
+import codecs
+import csv
+import json
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+READ_SIZE = 64 * 1024
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(file) -> str:
+    """Picks "csv" or "json" from the upload's content type or file name."""
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    filename = (file.filename or "").lower()
+    if content_type in ("text/csv", "application/csv") or filename.endswith(".csv"):
+        return "csv"
+    if content_type == "application/json" or filename.endswith(".json"):
+        return "json"
+    raise HTTPException(
+        status_code=415, detail="Upload a CSV file or a JSON array.")
+
+
+def iter_csv_rows(stream):
+    """Yields each CSV record as a dict keyed by the header row."""
+    text = codecs.getreader("utf-8-sig")(stream)
+    for row in csv.DictReader(text):
+        # Empty cells mean "not given", so optional fields fall back to None
+        yield {key: value for key, value in row.items() if value not in ("", None)}
+
+
+def iter_json_array(stream):
+    """Yields the elements of a top-level JSON array without loading it whole."""
+    reader = codecs.getreader("utf-8-sig")(stream)
+    decoder = json.JSONDecoder()
+    buffer, eof, expecting = "", False, "["
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer or expecting == "value-more":
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = reader.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            expecting = "value" if expecting == "value-more" else expecting
+            continue
+
+        if expecting == "[":
+            if buffer[0] != "[":
+                raise ValueError("Expected a JSON array")
+            buffer, expecting = buffer[1:], "first"
+        elif expecting == "separator":
+            if buffer[0] == "]":
+                return
+            if buffer[0] != ",":
+                raise ValueError("Expected ',' or ']' in JSON array")
+            buffer, expecting = buffer[1:], "value"
+        elif expecting == "first" and buffer[0] == "]":
+            return
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Malformed JSON array")
+                expecting = "value-more"
+                continue
+            if end == len(buffer) and not eof:
+                # The value may continue in the next chunk (e.g. a number)
+                expecting = "value-more"
+                continue
+            yield value
+            buffer, expecting = buffer[end:], "separator"
+
+
+def iter_upload_rows(file):
+    """Yields the raw rows of an uploaded CSV file or JSON array."""
+    if detect_format(file) == "csv":
+        return iter_csv_rows(file.file)
+    return iter_json_array(file.file)
+
+
+def validate_rows(rows, schema, start):
+    """
+    Validates parsed rows against ``schema``, returning the valid models
+    and an error entry, numbered from ``start``, for every invalid row.
+    """
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=start):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": ["Row must be an object"]})
+            continue
+        try:
+            valid.append(schema.model_validate(row))
+        except ValidationError as e:
+            errors.append({"row": number, "errors": [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()]})
+    return valid, errors
+
+
+def _next_chunk(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            break
+    return chunk
+
+
+async def import_rows(file, schema, insert_chunk, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Streams ``file`` through ``schema`` validation and hands each chunk of
+    valid models to ``insert_chunk``, which inserts and commits them.
+
+    Returns counts and a per-row error report (truncated after
+    ``MAX_REPORTED_ERRORS`` entries). Parsing runs in the threadpool.
+    """
+    rows = iter_upload_rows(file)
+    inserted, failed, errors = 0, 0, []
+    number = 1
+
+    while True:
+        try:
+            chunk = await run_in_threadpool(_next_chunk, rows, chunk_size)
+        except (ValueError, csv.Error) as e:
+            errors.append({"row": number, "errors": [f"Could not parse file: {e}"]})
+            failed += 1
+            break
+        if not chunk:
+            break
+
+        valid, chunk_errors = validate_rows(chunk, schema, number)
+        number += len(chunk)
+        if valid:
+            await insert_chunk(valid)
+        inserted += len(valid)
+        failed += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
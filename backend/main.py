@@ -1,15 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
-from routes import auth, income, expense, receipt, form
-from models.base import Base
-from database import engine
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from config import (COMPRESSION_MIN_BYTES, ENABLE_RECEIPT_EXTRACTION,
+                    RECEIPT_MODEL_LOADING, SLOW_REQUEST_MS)
+from compression import CompressionMiddleware
+from routes import auth, income, expense, receipt, form, export, summary, sync
+from database import async_engine
+from pagination import NEXT_CURSOR_HEADER
+import metrics
 
 import models.user
 import models.income_model
 import models.expense_model
 import models.receipt_model
+import models.rollup_model
+import models.collection_version_model
+import models.change_feed_model
 
-app = FastAPI()
+if ENABLE_RECEIPT_EXTRACTION:
+    from routes import receipt_extraction
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if ENABLE_RECEIPT_EXTRACTION:
+        if RECEIPT_MODEL_LOADING == "background":
+            receipt_extraction.receipt_service.load_in_background()
+        receipt_extraction.receipt_jobs.start()
+    yield
+    if ENABLE_RECEIPT_EXTRACTION:
+        receipt_extraction.receipt_jobs.stop()
+        receipt_extraction.receipt_service.close()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,12 +45,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    return await metrics.record_request(request, call_next, SLOW_REQUEST_MS / 1000)
+
+
 app.include_router(auth.router, prefix='/auth')
 app.include_router(income.router, prefix='/income')
 app.include_router(expense.router, prefix='/expense')
 app.include_router(receipt.router, prefix='/receipt')
 app.include_router(form.router, prefix='/form')
+app.include_router(export.router, prefix='/export')
+app.include_router(summary.router, prefix='/summary')
+app.include_router(sync.router, prefix='/sync')
+if ENABLE_RECEIPT_EXTRACTION:
+    app.include_router(receipt_extraction.router, prefix='/receipt')
+
+
+@app.get('/ready', status_code=200)
+def readiness():
+    """
+    Reports whether the worker can serve traffic, answering 503 until the
+    receipt model has warmed up (or failed to) in background loading mode.
+    """
+    if not ENABLE_RECEIPT_EXTRACTION:
+        return {"status": "ready", "receipt_model": {"state": "disabled"}}
+
+    model_status = receipt_extraction.receipt_service.status()
+    ready = model_status["state"] == "ready" or (
+        RECEIPT_MODEL_LOADING == "lazy" and model_status["state"] == "not_loaded")
+    body = {"status": "ready" if ready else "unavailable",
+            "receipt_model": model_status}
+    return body if ready else JSONResponse(body, status_code=503)
 
 
-Base.metadata.create_all(engine)
+@app.get('/metrics', response_class=PlainTextResponse)
+def get_metrics():
+    """Request, query and receipt stage metrics of this worker process."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,218 @@
+"""In-process request, query and receipt pipeline metrics, in Prometheus text format"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """Monotonic count, one series per combination of label values."""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, such as requests in flight."""
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Counter):
+    """Observations counted into cumulative ``le`` buckets, plus their sum."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count)
+                      for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            for bound, bucket_count in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", key + (("le", bound),), bucket_count))
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce the response headers.",
+    ("method", "route"))
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being handled.", ("method",))
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries run per HTTP request.",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Database statement execution time.")
+STAGE_SECONDS = Histogram(
+    "receipt_stage_duration_seconds", "Time spent in each receipt extraction stage.",
+    ("stage",))
+
+
+class RequestStats:
+    """Queries and stage timings accumulated while one request is handled."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stages = {}
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Times a block as ``stage``, for the histogram and the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        stats = _current.get()
+        if stats is not None:
+            stats.stages[stage] = stats.stages.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_stages():
+    """Gathers the stage timings of a block, to report them from another process."""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats.stages
+    finally:
+        _current.reset(token)
+
+
+def observe_stages(stages):
+    """Records stage timings measured in another process, such as a pool worker."""
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    QUERY_SECONDS.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def instrument_engine(engine):
+    """Counts and times every statement run on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def record_request(request, call_next, slow_request_s):
+    """
+    HTTP middleware body: records latency, in-flight count and query
+    stats per route template, and logs requests slower than
+    ``slow_request_s`` with their query and stage breakdown.
+    """
+    stats = RequestStats()
+    token = _current.set(stats)
+    method = request.method
+    REQUESTS_IN_FLIGHT.inc(method=method)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        REQUESTS_IN_FLIGHT.dec(method=method)
+        _current.reset(token)
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        REQUESTS.inc(method=method, route=path, status=status)
+        REQUEST_SECONDS.observe(elapsed, method=method, route=path)
+        REQUEST_QUERIES.observe(stats.queries, method=method, route=path)
+
+        if elapsed >= slow_request_s:
+            stages = " ".join(f"{stage}={seconds * 1000:.1f}ms"
+                              for stage, seconds in stats.stages.items())
+            logger.warning(
+                "Slow request: %s %s -> %s in %.1fms; %d queries in %.1fms; %s",
+                method, path, status, elapsed * 1000, stats.queries,
+                stats.query_seconds * 1000, stages or "no stages")
@@ -0,0 +1,85 @@
+"""
+Applies versioned schema migrations, out of band from the API.
+
+Usage, from the backend directory:
+    python migrate.py            # apply pending migrations
+    python migrate.py status     # list applied and pending migrations
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from database import engine
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "versions")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def load_migrations():
+    """Returns (version, name, module) for every migration file, in order."""
+    migrations = []
+    for filename in sorted(os.listdir(VERSIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        spec = importlib.util.spec_from_file_location(
+            f"migrations.versions.m{match[1]}", os.path.join(VERSIONS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append((int(match[1]), match[2], module))
+    return migrations
+
+
+def applied_versions(connection):
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def upgrade():
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+
+    for version, name, module in load_migrations():
+        if version in applied:
+            continue
+        print(f"Applying {version:04d}_{name}")
+        # Each migration commits on its own, so a failure leaves earlier ones applied
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.now(timezone.utc)))
+
+
+def status():
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    for version, name, _ in load_migrations():
+        state = "applied" if version in applied else "pending"
+        print(f"{version:04d}_{name}: {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    args = parser.parse_args()
+    if args.command == "status":
+        status()
+    else:
+        upgrade()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Initial schema, as previously created by Base.metadata.create_all.
+
+Tables that already exist are left untouched, so databases created before
+migrations were introduced adopt this version as-is.
+"""
+
+from sqlalchemy import (Column, Date, Float, ForeignKey, Integer, LargeBinary,
+                        MetaData, String, Table)
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, index=True),
+    Column("name", String),
+    Column("password", LargeBinary),
+)
+
+Table(
+    "income", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("date", Date, nullable=False),
+    Column("income_category", String, nullable=False),
+    Column("description", String, nullable=True),
+    Column("total", Float),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+Table(
+    "expense", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("date", Date, nullable=False),
+    Column("expense_category", String, nullable=False),
+    Column("description", String, nullable=True),
+    Column("total", Float),
+    Column("tax", Float),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+Table(
+    "receipt", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("expense_id", Integer, ForeignKey("expense.id"), nullable=True),
+    Column("receipt_image", String, nullable=True),
+    Column("date_uploaded", Date, nullable=True),
+    Column("vendor_name", String, nullable=True),
+    Column("total_amount", Float, nullable=True),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,40 @@
+"""
+Indexes for the per-user list, delete and tax form queries.
+
+- (user_id, date, id) on income and expense serves keyset pages and
+  date-range filters, and doubles as the user_id foreign key index.
+- (user_id, <category>) serves category filters and the GROUP BY in
+  /form/generate_tax_forms.
+- receipt gets (user_id, date_uploaded, id) and an expense_id index for
+  the join in get_receipts and the lookup in delete_expense.
+- users.email becomes unique; this fails if duplicate emails exist, which
+  must be resolved by hand first.
+"""
+
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, Index
+
+metadata = MetaData()
+
+users = Table("users", metadata, Column("id", Integer), Column("email", String))
+income = Table("income", metadata, Column("id", Integer), Column("user_id", Integer),
+               Column("date", Date), Column("income_category", String))
+expense = Table("expense", metadata, Column("id", Integer), Column("user_id", Integer),
+                Column("date", Date), Column("expense_category", String))
+receipt = Table("receipt", metadata, Column("id", Integer), Column("user_id", Integer),
+                Column("expense_id", Integer), Column("date_uploaded", Date))
+
+NEW_INDEXES = [
+    Index("ix_income_user_id_date", income.c.user_id, income.c.date, income.c.id),
+    Index("ix_income_user_id_category", income.c.user_id, income.c.income_category),
+    Index("ix_expense_user_id_date", expense.c.user_id, expense.c.date, expense.c.id),
+    Index("ix_expense_user_id_category", expense.c.user_id, expense.c.expense_category),
+    Index("ix_receipt_user_id_date", receipt.c.user_id, receipt.c.date_uploaded, receipt.c.id),
+    Index("ix_receipt_expense_id", receipt.c.expense_id),
+]
+
+
+def upgrade(connection):
+    Index("ix_users_email", users.c.email).drop(connection, checkfirst=True)
+    Index("ix_users_email", users.c.email, unique=True).create(connection)
+    for index in NEW_INDEXES:
+        index.create(connection, checkfirst=True)
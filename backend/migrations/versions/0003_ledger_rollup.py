@@ -0,0 +1,49 @@
+"""
+Per-user monthly rollups of income and expense totals by category.
+
+The table is kept up to date by the ledger write routes; this migration
+creates it and fills it from the rows that already exist.
+"""
+
+from sqlalchemy import (Column, Date, Float, ForeignKey, Integer, MetaData,
+                        String, Table, cast, extract, func, literal, select)
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+income = Table("income", metadata, Column("user_id", Integer), Column("date", Date),
+               Column("income_category", String), Column("total", Float))
+expense = Table("expense", metadata, Column("user_id", Integer), Column("date", Date),
+                Column("expense_category", String), Column("total", Float),
+                Column("tax", Float))
+
+ledger_rollup = Table(
+    "ledger_rollup", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("year", Integer, primary_key=True),
+    Column("month", Integer, primary_key=True),
+    Column("kind", String, primary_key=True),
+    Column("category", String, primary_key=True),
+    Column("total", Float, nullable=False),
+    Column("tax", Float, nullable=False),
+    Column("entries", Integer, nullable=False),
+)
+
+
+def grouped(table, kind, category, tax):
+    year = cast(extract("year", table.c.date), Integer).label("year")
+    month = cast(extract("month", table.c.date), Integer).label("month")
+    return (
+        select(table.c.user_id, year, month, literal(kind), category,
+               func.coalesce(func.sum(table.c.total), 0.0), tax, func.count())
+        .group_by(table.c.user_id, year, month, category))
+
+
+def upgrade(connection):
+    ledger_rollup.create(connection)
+    columns = ["user_id", "year", "month", "kind", "category", "total", "tax", "entries"]
+    connection.execute(ledger_rollup.insert().from_select(columns, grouped(
+        income, "income", income.c.income_category, literal(0.0))))
+    connection.execute(ledger_rollup.insert().from_select(columns, grouped(
+        expense, "expense", expense.c.expense_category,
+        func.coalesce(func.sum(expense.c.tax), 0.0))))
@@ -0,0 +1,13 @@
+"""
+Reference to a receipt's image in the content-addressed blob store.
+
+Inline images already in receipt.receipt_image are moved into the store
+by ``python -m scripts.move_receipt_images``, which can run while the API
+is serving.
+"""
+
+from sqlalchemy import text
+
+
+def upgrade(connection):
+    connection.execute(text("ALTER TABLE receipt ADD COLUMN image_ref VARCHAR(64)"))
@@ -0,0 +1,21 @@
+"""
+Per-user version counters of the income, expense and receipt collections,
+behind the ETags of the list endpoints. Missing rows read as version 0.
+"""
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+collection_versions = Table(
+    "collection_versions", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("collection", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(connection):
+    collection_versions.create(connection)
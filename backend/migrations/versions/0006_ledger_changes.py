@@ -0,0 +1,54 @@
+"""
+Change feed behind /sync: the latest change of every income, expense and
+receipt record, numbered by a per-user sequence, with tombstones for
+deleted records.
+
+Existing records are entered as changes 1..n of their user, and each
+user's sequence counter (collection "changes" in collection_versions) is
+set to n, so a client syncing from cursor 0 receives the whole ledger.
+"""
+
+from sqlalchemy import (Boolean, Column, ForeignKey, Index, Integer, MetaData,
+                        String, Table, false, func, literal, select, union_all)
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+income = Table("income", metadata, Column("id", Integer), Column("user_id", Integer))
+expense = Table("expense", metadata, Column("id", Integer), Column("user_id", Integer))
+receipt = Table("receipt", metadata, Column("id", Integer), Column("user_id", Integer))
+collection_versions = Table(
+    "collection_versions", metadata,
+    Column("user_id", Integer), Column("collection", String), Column("version", Integer))
+
+ledger_changes = Table(
+    "ledger_changes", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("seq", Integer, primary_key=True),
+    Column("collection", String, nullable=False),
+    Column("record_id", Integer, nullable=False),
+    Column("deleted", Boolean, nullable=False),
+    Index("ix_ledger_changes_record", "user_id", "collection", "record_id"),
+)
+
+
+def upgrade(connection):
+    ledger_changes.create(connection)
+
+    records = union_all(*(
+        select(table.c.user_id, literal(collection).label("collection"),
+               table.c.id.label("record_id"))
+        for table, collection in ((income, "incomes"), (expense, "expenses"),
+                                  (receipt, "receipts")))).subquery()
+    seq = func.row_number().over(
+        partition_by=records.c.user_id,
+        order_by=(records.c.collection, records.c.record_id))
+    connection.execute(ledger_changes.insert().from_select(
+        ["user_id", "seq", "collection", "record_id", "deleted"],
+        select(records.c.user_id, seq, records.c.collection, records.c.record_id,
+               false())))
+
+    connection.execute(collection_versions.insert().from_select(
+        ["user_id", "collection", "version"],
+        select(ledger_changes.c.user_id, literal("changes"), func.max(ledger_changes.c.seq))
+        .group_by(ledger_changes.c.user_id)))
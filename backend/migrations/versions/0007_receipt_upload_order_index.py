@@ -0,0 +1,30 @@
+"""
+Replaces ix_receipt_user_id_date with an index on the expression receipt
+listings actually order and seek by:
+
+    (user_id, coalesce(date_uploaded, '0001-01-01'), id)
+
+Receipts without an upload date sort first. A plain index on
+date_uploaded cannot serve that order, so receipt pages fell back to
+sorting the user's whole receipt set. The new index still leads with
+user_id, so it also covers the user_id foreign key.
+"""
+
+from sqlalchemy import (Column, Date, Index, Integer, MetaData, Table, func,
+                        literal_column, text)
+
+metadata = MetaData()
+
+receipt = Table("receipt", metadata, Column("id", Integer), Column("user_id", Integer),
+                Column("date_uploaded", Date))
+
+upload_order = Index(
+    "ix_receipt_user_id_upload_order", receipt.c.user_id,
+    func.coalesce(receipt.c.date_uploaded, literal_column("'0001-01-01'", Date)),
+    receipt.c.id)
+
+
+def upgrade(connection):
+    upload_order.create(connection)
+    # Reflection cannot see expression indexes, so skip checkfirst here
+    connection.execute(text("DROP INDEX IF EXISTS ix_receipt_user_id_date"))
@@ -0,0 +1,58 @@
+"""Content-addressed file store for receipt images"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """
+    Stores blobs under ``root`` by the SHA-256 of their content, sharded
+    as ``ab/cd/abcd...`` so no directory grows too large. Identical
+    content is stored once, and every write lands atomically via a
+    temporary file and ``os.replace``.
+
+    Derived files (e.g. a thumbnail) live next to their blob as
+    ``<digest><variant>``.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def is_digest(value):
+        return isinstance(value, str) and DIGEST.match(value) is not None
+
+    def path(self, digest, variant=""):
+        if not self.is_digest(digest):
+            raise ValueError("Invalid blob digest")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + variant)
+
+    def exists(self, digest, variant=""):
+        return os.path.exists(self.path(digest, variant))
+
+    def put(self, data):
+        """Stores ``data`` and returns (digest, whether it was new)."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest, False
+        self.write(digest, data)
+        return digest, True
+
+    def write(self, digest, data, variant=""):
+        path = self.path(digest, variant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
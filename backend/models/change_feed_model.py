@@ -0,0 +1,101 @@
+"""Ledger Change Feed Model"""
+
+from sqlalchemy import (Boolean, Column, ForeignKey, Index, Integer, String,
+                        delete, false, func, insert, literal, select, union_all)
+from sqlalchemy.dialects import postgresql, sqlite
+from models.base import Base
+from models.collection_version_model import (CHANGES, EXPENSES, INCOMES, RECEIPTS,
+                                             CollectionVersion)
+from models.expense_model import Expense
+from models.income_model import Income
+from models.receipt_model import Receipt
+
+
+class LedgerChange(Base):
+    """
+    Latest change of one income, expense or receipt record, numbered by
+    the user's change sequence. Deleted records leave a tombstone.
+    """
+    __tablename__ = "ledger_changes"
+    __table_args__ = (
+        Index("ix_ledger_changes_record", "user_id", "collection", "record_id"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    collection = Column(String, nullable=False)
+    record_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+
+def next_seq_statement(dialect_name, user_id, count):
+    """
+    Reserves ``count`` numbers of the user's change sequence, returning
+    the last one. The counter row stays locked until the transaction
+    ends, so a user's changes commit in sequence order.
+    """
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(CollectionVersion).values(
+        user_id=user_id, collection=CHANGES, version=count)
+    return statement.on_conflict_do_update(
+        index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+        set_={"version": CollectionVersion.version + statement.excluded.version},
+    ).returning(CollectionVersion.version)
+
+
+def supersede_statement(user_id, collection, record_ids):
+    """Drops the earlier changes of records about to get a newer one."""
+    return delete(LedgerChange).where(
+        LedgerChange.user_id == user_id,
+        LedgerChange.collection == collection,
+        LedgerChange.record_id.in_(record_ids))
+
+
+def change_rows(user_id, collection, record_ids, last_seq, deleted=False):
+    first_seq = last_seq - len(record_ids) + 1
+    return [{"user_id": user_id, "seq": first_seq + offset, "collection": collection,
+             "record_id": record_id, "deleted": deleted}
+            for offset, record_id in enumerate(record_ids)]
+
+
+async def record_changes(db, user_id, collection, record_ids, deleted=False, created=False):
+    """
+    Appends changes of ``record_ids`` to the feed inside the caller's
+    (async) transaction. ``created`` skips looking for earlier changes of
+    records that were only just inserted.
+
+    Call it last, just before committing: every write path takes its row
+    locks in the same order (ledger rows, rollups, collection versions,
+    then the sequence counter), so concurrent writes of a user cannot
+    deadlock.
+    """
+    record_ids = list(record_ids)
+    if not record_ids:
+        return
+    last_seq = await db.scalar(
+        next_seq_statement(db.bind.dialect.name, user_id, len(record_ids)))
+    if not created:
+        await db.execute(supersede_statement(user_id, collection, record_ids))
+    await db.execute(insert(LedgerChange),
+                     change_rows(user_id, collection, record_ids, last_seq, deleted))
+
+
+def enter_ledger(connection, user_id):
+    """
+    Enters every record of a user whose feed is still empty as changes
+    1..n, and sets the sequence counter to n. For bulk loads that bypass
+    the routes.
+    """
+    records = union_all(*(
+        select(literal(collection).label("collection"), model.id.label("record_id"))
+        .where(model.user_id == user_id)
+        for model, collection in ((Income, INCOMES), (Expense, EXPENSES),
+                                  (Receipt, RECEIPTS)))).subquery()
+    seq = func.row_number().over(order_by=(records.c.collection, records.c.record_id))
+    connection.execute(insert(LedgerChange).from_select(
+        ["user_id", "seq", "collection", "record_id", "deleted"],
+        select(literal(user_id), seq, records.c.collection, records.c.record_id, false())))
+    last_seq = connection.scalar(select(func.coalesce(func.max(LedgerChange.seq), 0))
+                                 .where(LedgerChange.user_id == user_id))
+    if last_seq:
+        connection.execute(next_seq_statement(connection.dialect.name, user_id, last_seq))
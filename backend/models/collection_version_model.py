@@ -0,0 +1,45 @@
+"""Collection Version Model"""
+
+from sqlalchemy import Column, ForeignKey, Integer, String, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.base import Base
+
+INCOMES = "incomes"
+EXPENSES = "expenses"
+RECEIPTS = "receipts"
+# Not collections: the counter behind each user's ledger change sequence,
+# and the version of the user's profile (email, name, password)
+CHANGES = "changes"
+PROFILE = "profile"
+
+
+class CollectionVersion(Base):
+    """Counter bumped whenever one of a user's ledger collections changes."""
+    __tablename__ = "collection_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def bump_statement(dialect_name, user_id, collections):
+    """One INSERT ... ON CONFLICT statement incrementing each collection's version."""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(CollectionVersion).values([
+        {"user_id": user_id, "collection": collection, "version": 1}
+        for collection in sorted(set(collections))])
+    return statement.on_conflict_do_update(
+        index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+        set_={"version": CollectionVersion.version + 1})
+
+
+async def bump_versions(db, user_id, *collections):
+    """Bumps collection versions inside the caller's (async) transaction."""
+    await db.execute(bump_statement(db.bind.dialect.name, user_id, collections))
+
+
+async def get_version(db, user_id, collection):
+    version = await db.scalar(select(CollectionVersion.version).where(
+        CollectionVersion.user_id == user_id,
+        CollectionVersion.collection == collection))
+    return version or 0
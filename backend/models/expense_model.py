@@ -1,12 +1,16 @@
 """Expense Model"""
 
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 
 class Expense(Base):
     __tablename__ = "expense"
+    __table_args__ = (
+        Index("ix_expense_user_id_date", "user_id", "date", "id"),
+        Index("ix_expense_user_id_category", "user_id", "expense_category"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False)
@@ -1,103 +1,184 @@
 import torch
-from collections import Counter
 from transformers import AutoModelForTokenClassification, AutoProcessor
 from PIL import Image
+from metrics import stage_timer
+
+
+# "eager" runs the fp32 model as loaded, "int8" dynamically quantizes its
+# linear layers and "traced" runs a TorchScript graph on fixed-length inputs.
+BACKENDS = ("eager", "int8", "traced")
+TRACED_SEQUENCE_LENGTH = 512
 
 
 class ReceiptReader:
-    def __init__(self, path_to_model="model"):
+    def __init__(self, path_to_model="model", backend="eager"):
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
         self.model = AutoModelForTokenClassification.from_pretrained(
-            path_to_model)
+            path_to_model, torchscript=backend == "traced")
         self.model.eval()
+        if backend == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.traced_model = None
         self.processor = AutoProcessor.from_pretrained(path_to_model)
 
-    def __call__(self, image):
-        encodings = self.__get_encodings(image)
-        words = self.__get_words(encodings)
-        bboxes = encodings.bbox[0]
-        logits = self.model(**encodings).logits
+    def __call__(self, image, original_size=None):
+        return self.read_batch([image], [original_size])[0]
+
+    def read_batch(self, images, original_sizes=None):
+        """
+        Reads several receipts with a single padded forward pass.
+
+        ``original_sizes`` gives the (width, height) each image had before
+        being downscaled, so boxes map back to the uploaded image.
+        """
+        original_sizes = original_sizes or [None] * len(images)
+        with stage_timer("ocr_processor"):
+            encodings = self.__get_encodings(images)
+        with stage_timer("forward"), torch.no_grad():
+            logits = self.__forward(encodings)
         predictions = torch.argmax(logits, dim=2)
-        labeled_tokens = [self.model.config.id2label[t.item()]
-                          for t in predictions[0]]
-        response_dict = self.__merge_tokens(words, bboxes, labeled_tokens)
-        response_dict["bboxes"] = [self.__unnormalize_bbox(
-            bbox, image) for bbox in response_dict["bboxes"]]
-        return response_dict
-
-    def __get_encodings(self, image):
-        return self.processor(image, return_tensors="pt")
-
-    def __get_words(self, encodings):
-        words = [self.processor.tokenizer.decode(
-            input_id) for input_id in encodings.input_ids[0]]
-        return words
-
-    def __merge_tokens(self, words, bboxes, labels):
-        new_words = []
-        new_bboxes = []
-        new_labels = []
+        lengths = encodings.attention_mask.sum(dim=1).tolist()
+
+        with stage_timer("token_merge"):
+            words = self.__get_words(encodings.input_ids, lengths)
+            results = []
+            offset = 0
+            for index, (image, original_size) in enumerate(zip(images, original_sizes)):
+                length = lengths[index]
+                response_dict = self.__merge_tokens(
+                    words[offset:offset + length],
+                    encodings.bbox[index, :length],
+                    predictions[index, :length])
+                response_dict["bboxes"] = self.__unnormalize_bboxes(
+                    response_dict["bboxes"], original_size or image.size)
+                results.append(response_dict)
+                offset += length
+        return results
+
+    def __get_encodings(self, images):
+        if self.backend == "traced":
+            return self.processor(images, return_tensors="pt", padding="max_length",
+                                  truncation=True, max_length=TRACED_SEQUENCE_LENGTH)
+        return self.processor(images, return_tensors="pt", padding=True)
+
+    def __forward(self, encodings):
+        if self.backend != "traced":
+            return self.model(**encodings).logits
+
+        # The graph is traced for one fixed-length row, so rows run one by one
+        rows = [{name: tensor[index:index + 1] for name, tensor in encodings.items()}
+                for index in range(len(encodings.input_ids))]
+        if self.traced_model is None:
+            self.traced_model = torch.jit.trace(
+                self.model, example_kwarg_inputs=rows[0], strict=False)
+        return torch.cat([self.traced_model(**row)[0] for row in rows])
+
+    def __get_words(self, input_ids, lengths):
+        """Decodes every token of the batch on its own, in one call."""
+        token_ids = [[token_id] for row, length in zip(input_ids.tolist(), lengths)
+                     for token_id in row[:length]]
+        tokenizer = self.processor.tokenizer
+        if tokenizer.is_fast and not tokenizer.clean_up_tokenization_spaces:
+            return tokenizer.backend_tokenizer.decode_batch(
+                token_ids, skip_special_tokens=False)
+        return tokenizer.batch_decode(token_ids)
+
+    def __merge_tokens(self, words, bboxes, label_ids):
+        """
+        Merges runs of tokens sharing the bbox of the run's first token and
+        labels each run with its most frequent label, preferring any label
+        over "O" and breaking ties by first occurrence.
+        """
+        length = len(words)
+        positions = torch.arange(length)
+
+        # First token after each position whose bbox is more than 3 units off
+        close = (bboxes[:, None, :] - bboxes[None, :, :]).abs().le(3).all(dim=2)
+        breaks = ~close & (positions[None, :] > positions[:, None])
+        next_start = torch.where(
+            breaks.any(dim=1), breaks.long().argmax(dim=1), length).tolist()
+
+        starts = []
         i = 0
-        while i < len(words):
-            token, bbox, label = words[i], bboxes[i], labels[i]
-            j = i + 1
-            while j < len(words) and self.__is_same_bbox(bbox, bboxes[j]):
-                token += words[j]
-                j += 1
-            counter = Counter([labels[k] for k in range(i, j)])
-            sorted_labels = sorted(counter, key=counter.get, reverse=True)
-            label = sorted_labels[1] if sorted_labels[0] == "O" and len(
-                sorted_labels) > 1 else sorted_labels[0]
-            new_words.append(token)
-            new_bboxes.append(bbox)
-            new_labels.append(label)
-            i = j
-        return {"words": new_words, "bboxes": new_bboxes, "labels": new_labels}
-
-    def __is_same_bbox(self, bbox1, bbox2):
-        return all(abs(bbox1[i] - bbox2[i]) <= 3 for i in range(4))
-
-    def __unnormalize_bbox(self, bbox, image):
-        width, height = image.size
-        return [bbox[0] * width / 1000, bbox[1] * height / 1000, bbox[2] * width / 1000, bbox[3] * height / 1000]
+        while i < length:
+            starts.append(i)
+            i = next_start[i]
+        ends = starts[1:] + [length]
+
+        group_starts = torch.zeros(length, dtype=torch.long)
+        group_starts[starts[1:]] = 1
+        groups = group_starts.cumsum(dim=0)
+
+        num_labels = len(self.model.config.id2label)
+        cells = groups * num_labels + label_ids
+        counts = torch.bincount(cells, minlength=len(starts) * num_labels)
+        first_seen = torch.full_like(counts, length).scatter_reduce(
+            0, cells, positions, reduce="amin")
+        scores = torch.where(
+            counts > 0, counts * (length + 1) + (length - first_seen), -1
+        ).view(len(starts), num_labels)
+
+        outside = self.model.config.label2id["O"]
+        best = scores.argmax(dim=1)
+        labelled = scores.clone()
+        labelled[:, outside] = -1
+        best = torch.where((best == outside) & (labelled.max(dim=1).values >= 0),
+                           labelled.argmax(dim=1), best)
+
+        return {
+            "words": ["".join(words[i:j]) for i, j in zip(starts, ends)],
+            "bboxes": bboxes[starts],
+            "labels": [self.model.config.id2label[label] for label in best.tolist()],
+        }
+
+    def __unnormalize_bboxes(self, bboxes, size):
+        width, height = size
+        return bboxes * torch.tensor([width, height, width, height]) / 1000
 
 
 class ReceiptInformationExtractor:
-    def __init__(self, path_to_model="model"):
-        self.receipt_reader = ReceiptReader(path_to_model)
-
-    def __call__(self, image):
-        receipt_data = self.receipt_reader(image)
-        response_dict = {"company": "", "date": "",
-                         "address": "", "total": "", "tax": ""}
-
-        # Extract company
-        max_bbox = 0
-        for word, bbox, label in zip(receipt_data['words'], receipt_data["bboxes"], receipt_data["labels"]):
-            if label == "B-COMPANY" and (bbox_size := (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])) > max_bbox:
-                response_dict["company"], max_bbox = word.strip(), bbox_size
-
-        # Extract address
-        max_bbox = 0
-        for word, bbox, label in zip(receipt_data['words'], receipt_data["bboxes"], receipt_data["labels"]):
-            if label == "B-ADDRESS" and (bbox_size := (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])) > max_bbox:
-                response_dict["address"], max_bbox = word.strip(), bbox_size
-
-        # Extract date
-        min_y = float("inf")
-        for word, bbox, label in zip(receipt_data['words'], receipt_data["bboxes"], receipt_data["labels"]):
-            if label == "B-DATE" and bbox[1] < min_y:
-                response_dict["date"], min_y = word.strip(), bbox[1]
-
-        # Extract total
-        max_y = 0
-        for word, bbox, label in zip(receipt_data['words'], receipt_data["bboxes"], receipt_data["labels"]):
-            if label == "B-TOTAL" and bbox[3] > max_y:
-                response_dict["total"], max_y = word.strip(), bbox[3]
-
-        # Extract tax
-        max_bbox = 0
-        for word, bbox, label in zip(receipt_data['words'], receipt_data["bboxes"], receipt_data["labels"]):
-            if label == "B-TAX" and (bbox_size := (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])) > max_bbox:
-                response_dict["tax"], max_bbox = word.strip(), bbox_size
-
-        return response_dict
+    def __init__(self, path_to_model="model", backend="eager"):
+        self.receipt_reader = ReceiptReader(path_to_model, backend)
+
+    def __call__(self, image, original_size=None):
+        return self.extract_batch([image], [original_size])[0]
+
+    def extract_batch(self, images, original_sizes=None):
+        """Extracts the receipt fields of several images in one forward pass."""
+        receipts = self.receipt_reader.read_batch(images, original_sizes)
+        with stage_timer("field_extraction"):
+            return [self.extract_fields(receipt_data) for receipt_data in receipts]
+
+    def extract_fields(self, receipt_data):
+        words, bboxes = receipt_data["words"], receipt_data["bboxes"]
+        label2id = self.receipt_reader.model.config.label2id
+        label_ids = torch.tensor([label2id[label]
+                                 for label in receipt_data["labels"]])
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+        return {
+            # Largest company, address and tax boxes
+            "company": self.__pick_largest(words, label_ids == label2id["B-COMPANY"], areas),
+            "date": self.__pick_topmost(words, label_ids == label2id["B-DATE"], bboxes[:, 1]),
+            "address": self.__pick_largest(words, label_ids == label2id["B-ADDRESS"], areas),
+            # Bottom-most total
+            "total": self.__pick_largest(words, label_ids == label2id["B-TOTAL"], bboxes[:, 3]),
+            "tax": self.__pick_largest(words, label_ids == label2id["B-TAX"], areas),
+        }
+
+    def __pick_largest(self, words, mask, values):
+        """First word in ``mask`` with the highest positive value."""
+        candidates = torch.where(mask, values, float("-inf"))
+        index = int(candidates.argmax())
+        return words[index].strip() if candidates[index] > 0 else ""
+
+    def __pick_topmost(self, words, mask, values):
+        """First word in ``mask`` with the lowest value."""
+        if not mask.any():
+            return ""
+        candidates = torch.where(mask, values, float("inf"))
+        return words[int(candidates.argmin())].strip()
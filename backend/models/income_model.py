@@ -1,12 +1,16 @@
 """Income Model"""
 
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 
 class Income(Base):
     __tablename__ = "income"
+    __table_args__ = (
+        Index("ix_income_user_id_date", "user_id", "date", "id"),
+        Index("ix_income_user_id_category", "user_id", "income_category"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False)
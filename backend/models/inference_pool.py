@@ -0,0 +1,225 @@
+"""Runs receipt extraction in a pool of dedicated worker processes"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from metrics import collect_stages, observe_stages
+
+
+def _worker_main(path_to_model, backend, tesseract_cmd, tasks, results):
+    """Loads an extractor and serves batches of images until told to stop."""
+    import os
+    import pytesseract
+    from models.extract_receipt_data import ReceiptInformationExtractor
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    extractor = ReceiptInformationExtractor(path_to_model, backend)
+    pid = os.getpid()
+    results.put(("ready", pid, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        try:
+            # Stage histograms live in the API process, so the timings
+            # travel back with the fields
+            with collect_stages() as stages:
+                fields = extractor.extract_batch(*task)
+            results.put(("done", pid, (fields, stages)))
+        except Exception as e:
+            results.put(("error", pid, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """Parent-side handle of one worker process and the batch it is running."""
+
+    def __init__(self, context, path_to_model, backend, tesseract_cmd, results):
+        self.tasks = context.Queue()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(path_to_model, backend, tesseract_cmd, self.tasks, results),
+            daemon=True)
+        self.process.start()
+        self.ready = False
+        self.batch = []
+        self.started_at = None
+        self.respawn_at = None
+
+    @property
+    def idle(self):
+        return self.ready and not self.batch
+
+    def run(self, batch):
+        self.batch = batch
+        self.started_at = time.monotonic()
+        self.tasks.put(([image for image, _, _ in batch],
+                        [size for _, size, _ in batch]))
+
+    def finish(self):
+        batch, self.batch, self.started_at = self.batch, [], None
+        return batch
+
+    def stop(self):
+        self.tasks.put(None)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class ReceiptInferencePool:
+    """
+    Spreads receipt extraction over ``workers`` processes, each holding its
+    own ``ReceiptInformationExtractor``.
+
+    Idle workers pick up to ``max_batch_size`` queued images at a time.
+    A batch running longer than ``job_timeout`` seconds fails with
+    ``TimeoutError`` and its worker is replaced, as is any worker that dies.
+    A worker that dies before its model has loaded is replaced after a
+    backoff doubling from ``respawn_backoff`` up to ``max_respawn_backoff``
+    seconds; after ``max_start_failures`` such deaths in a row, queued
+    images fail until a worker starts.
+    """
+
+    def __init__(self, path_to_model, workers=2, max_batch_size=8,
+                 job_timeout=60, backend="eager", tesseract_cmd=None,
+                 respawn_backoff=1, max_respawn_backoff=60, max_start_failures=3):
+        self.path_to_model = path_to_model
+        self.backend = backend
+        self.tesseract_cmd = tesseract_cmd
+        self.max_batch_size = max(1, max_batch_size)
+        self.job_timeout = job_timeout
+        self.respawn_backoff = respawn_backoff
+        self.max_respawn_backoff = max_respawn_backoff
+        self.max_start_failures = max(1, max_start_failures)
+        self._start_failures = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._pending = queue.Queue()
+        self._closed = threading.Event()
+        self._workers = [self._spawn() for _ in range(max(1, workers))]
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="receipt-pool", daemon=True)
+        self._supervisor.start()
+
+    def __call__(self, image, original_size=None):
+        return self.submit(image, original_size).result()
+
+    def submit(self, image, original_size=None) -> Future:
+        """Queues an image and returns a future resolving to its fields."""
+        if self._closed.is_set():
+            raise RuntimeError("Receipt inference pool is closed")
+        future = Future()
+        self._pending.put((image, original_size, future))
+        return future
+
+    def close(self):
+        """Stops the supervisor and shuts every worker down."""
+        self._closed.set()
+        self._supervisor.join()
+        for worker in self._workers:
+            worker.stop()
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.kill()
+        self._fail_pending(RuntimeError("Receipt inference pool is closed"))
+
+    def _spawn(self):
+        return _Worker(self._context, self.path_to_model, self.backend,
+                       self.tesseract_cmd, self._results)
+
+    def _supervise(self):
+        while not self._closed.is_set():
+            self._collect_results(timeout=0.05)
+            self._replace_failed_workers()
+            if self._start_failures >= self.max_start_failures:
+                self._fail_pending(RuntimeError(
+                    "Receipt inference workers failed to start"))
+            self._dispatch()
+
+    def _collect_results(self, timeout):
+        try:
+            kind, pid, payload = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return
+
+        worker = next(
+            (w for w in self._workers if w.process.pid == pid), None)
+        if worker is None:
+            return
+        if kind == "ready":
+            worker.ready = True
+            self._start_failures = 0
+            return
+
+        batch = worker.finish()
+        if kind == "done":
+            payload, stages = payload
+            observe_stages(stages)
+        for index, (_, _, future) in enumerate(batch):
+            if kind == "done":
+                future.set_result(payload[index])
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _replace_failed_workers(self):
+        now = time.monotonic()
+        for index, worker in enumerate(self._workers):
+            if worker.respawn_at is not None:
+                if now >= worker.respawn_at:
+                    self._workers[index] = self._spawn()
+                continue
+            if not worker.process.is_alive():
+                error = RuntimeError("Receipt inference worker crashed")
+            elif worker.batch and now - worker.started_at > self.job_timeout:
+                error = TimeoutError("Receipt extraction timed out")
+            else:
+                continue
+
+            worker.kill()
+            for _, _, future in worker.finish():
+                future.set_exception(error)
+            if worker.ready:
+                self._workers[index] = self._spawn()
+            else:
+                # It died loading the model, which a retry right away
+                # would most likely repeat
+                self._start_failures += 1
+                worker.respawn_at = now + min(
+                    self.max_respawn_backoff,
+                    self.respawn_backoff * 2 ** (self._start_failures - 1))
+
+    def _dispatch(self):
+        for worker in self._workers:
+            if not worker.idle:
+                continue
+            batch = self._take_batch()
+            if not batch:
+                return
+            worker.run(batch)
+
+    def _take_batch(self):
+        batch = []
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item[2].set_running_or_notify_cancel():
+                batch.append(item)
+        return batch
+
+    def _fail_pending(self, error):
+        while True:
+            try:
+                _, _, future = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
@@ -0,0 +1,98 @@
+"""Micro-batches concurrent receipt extraction requests"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class ReceiptBatcher:
+    """
+    Collects images submitted from concurrent requests and hands them, with
+    their original sizes, to ``batch_fn`` together, so many receipts share
+    one forward pass.
+
+    A batch is flushed once it holds ``max_batch_size`` images or
+    ``max_wait_ms`` milliseconds after its first image arrived. If
+    ``batch_fn`` raises, the images are retried one at a time, so an error
+    only reaches the request that caused it.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="receipt-batcher", daemon=True)
+        self._worker.start()
+
+    def __call__(self, image, original_size=None):
+        return self.submit(image, original_size).result()
+
+    def submit(self, image, original_size=None) -> Future:
+        """Queues an image and returns a future resolving to its own result."""
+        future = Future()
+        self._queue.put((image, original_size, future))
+        return future
+
+    def close(self):
+        """Stops the worker once the queued images have been processed."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch):
+        batch = [item for item in batch
+                 if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        images, original_sizes, futures = zip(*batch)
+        try:
+            results = self.batch_fn(list(images), list(original_sizes))
+        except Exception as e:
+            if len(batch) == 1:
+                futures[0].set_exception(e)
+                return
+            # One bad image must not fail the requests it was batched
+            # with, so each gets its own result or error
+            for item in batch:
+                self._process_one(*item)
+            return
+
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def _process_one(self, image, original_size, future):
+        try:
+            result, = self.batch_fn([image], [original_size])
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
@@ -0,0 +1,113 @@
+"""Content-addressed cache of receipt extraction results"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+_MODEL_FILES = ("config.json", "preprocessor_config.json",
+                "model.safetensors", "pytorch_model.bin")
+
+
+def model_version(path_to_model):
+    """Fingerprints the model directory so retrained weights miss the cache."""
+    digest = hashlib.sha256()
+    for name in _MODEL_FILES:
+        path = os.path.join(path_to_model, name)
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def image_key(image, version):
+    """Hashes the decoded pixels of an image together with the model version."""
+    digest = hashlib.sha256(version.encode())
+    digest.update(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ReceiptCache:
+    """
+    Two-tier cache of extraction results: a bounded in-memory LRU in front
+    of an optional directory of JSON files that survives restarts.
+    """
+
+    def __init__(self, max_entries=1024, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _remember(self, key, result):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,72 @@
+"""Bounded reading and decoding of uploaded receipt images"""
+
+import base64
+import binascii
+import io
+import math
+
+from PIL import Image
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+async def read_upload(file, max_bytes, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Reads an ``UploadFile`` in chunks, giving up once it passes ``max_bytes``."""
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+
+    buffer = bytearray()
+    while chunk := await file.read(chunk_size):
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    return bytes(buffer)
+
+
+def load_receipt_image(contents, max_side):
+    """
+    Decodes an image no larger than ``max_side`` on its longest edge and
+    returns it with the (width, height) of the original upload.
+
+    JPEGs are decoded at a reduced DCT scale when that still covers
+    ``max_side``, so full-resolution pixels are never materialized.
+    """
+    image = Image.open(io.BytesIO(contents))
+    original_size = width, height = image.size
+    scale = max_side / max(original_size)
+    if scale < 1:
+        image.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return image, original_size
+
+
+def make_thumbnail(contents, side, quality=80):
+    """Encodes a JPEG thumbnail no larger than ``side`` on its longest edge."""
+    image, _ = load_receipt_image(contents, side)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def image_media_type(path):
+    """Media type of a stored image, read from its header only."""
+    with Image.open(path) as image:
+        return Image.MIME.get(image.format, "application/octet-stream")
+
+
+def decode_data_uri(value):
+    """Returns the bytes of a base64 ``data:`` URI, or None for any other string."""
+    if not value or not value.startswith("data:"):
+        return None
+    header, _, payload = value.partition(",")
+    if not header.endswith(";base64"):
+        raise ValueError("Only base64 data URIs are supported")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        raise ValueError("Malformed base64 image data")
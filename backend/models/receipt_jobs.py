@@ -0,0 +1,183 @@
+"""Persistent queue of asynchronous receipt extraction jobs"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipt_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    image BLOB,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS ix_receipt_jobs_status_created
+    ON receipt_jobs (status, created_at);
+"""
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many jobs are already waiting."""
+
+
+class ReceiptJobQueue:
+    """
+    Stores submitted images in a local SQLite file and runs them through
+    ``process_fn`` on ``concurrency`` worker threads.
+
+    Several processes may share the file. A running job is leased to the
+    queue that claimed it, which renews the lease every ``lease / 3``
+    seconds; only jobs whose lease ran out, because their process died,
+    are queued again. Finished jobs, with their result or error, are
+    purged after ``ttl`` seconds.
+    """
+
+    PURGE_INTERVAL_S = 60
+
+    def __init__(self, path, process_fn, concurrency=4, ttl=3600,
+                 max_queued=1000, poll_interval=0.25, lease=30):
+        self.path = path
+        self.process_fn = process_fn
+        self.concurrency = max(1, concurrency)
+        self.ttl = ttl
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_purge = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def start(self):
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"receipt-job-{index}",
+                             daemon=True)
+            for index in range(self.concurrency)]
+        self._threads.append(threading.Thread(
+            target=self._keep_leases, name="receipt-job-leases", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, image_bytes):
+        """Stores an image and returns the id of its new job."""
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            queued = conn.execute(
+                "SELECT COUNT(*) FROM receipt_jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFull("Too many receipt jobs are waiting")
+            conn.execute(
+                "INSERT INTO receipt_jobs (id, status, image, created_at) "
+                "VALUES (?, 'queued', ?, ?)",
+                (job_id, sqlite3.Binary(image_bytes), time.time()))
+        return job_id
+
+    def get(self, job_id):
+        """Returns the job's status and, once finished, its result or error."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT status, result, error FROM receipt_jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        status, result, error = row
+        job = {"job_id": job_id, "status": status}
+        if status == "done":
+            job["result"] = json.loads(result)
+        elif status == "failed":
+            job["error"] = error
+        return job
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _claim(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, image FROM receipt_jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE receipt_jobs SET status = 'running', owner = ?, "
+                    "lease_until = ? WHERE id = ?",
+                    (self.owner, time.time() + self.lease, row[0]))
+        return row
+
+    def _finish(self, job_id, result=None, error=None):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE receipt_jobs SET status = ?, result = ?, error = ?, "
+                "image = NULL, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                ("failed" if error else "done",
+                 None if error else json.dumps(result),
+                 error, time.time(), job_id, self.owner))
+
+    def _renew_leases(self):
+        """Extends this queue's leases and requeues jobs whose lease ran out."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE receipt_jobs SET lease_until = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (now + self.lease, self.owner))
+            conn.execute(
+                "UPDATE receipt_jobs SET status = 'queued', owner = NULL, "
+                "lease_until = NULL WHERE status = 'running' AND lease_until < ?",
+                (now,))
+
+    def _keep_leases(self):
+        while True:
+            self._renew_leases()
+            if self._stopping.wait(self.lease / 3):
+                return
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL_S:
+            return
+        self._last_purge = now
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM receipt_jobs WHERE finished_at < ?",
+                (now - self.ttl,))
+
+    def _work(self):
+        while not self._stopping.is_set():
+            self._purge_expired()
+            job = self._claim()
+            if job is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+
+            job_id, image_bytes = job
+            try:
+                self._finish(job_id, result=self.process_fn(bytes(image_bytes)))
+            except Exception as e:
+                self._finish(job_id, error=f"{type(e).__name__}: {e}")
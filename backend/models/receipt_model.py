@@ -1,20 +1,34 @@
 """Receipt Model"""
 
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
+from sqlalchemy import (Column, Integer, String, Date, Float, ForeignKey, Index,
+                        func, literal_column)
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 
 class Receipt(Base):
     __tablename__ = "receipt"
+    __table_args__ = (
+        Index("ix_receipt_expense_id", "expense_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     expense_id = Column(Integer, ForeignKey("expense.id"), nullable=True)
     receipt_image = Column(String, nullable=True)
+    image_ref = Column(String(64), nullable=True)
     date_uploaded = Column(Date, nullable=True)
     vendor_name = Column(String, nullable=True)
     total_amount = Column(Float, nullable=True)
 
     user = relationship("User", back_populates="receipts")
     expense = relationship("Expense", back_populates="receipts")
+
+
+# Receipts without an upload date sort before every dated one. Listings
+# order and seek by this exact expression, which the index below covers;
+# the constant is inlined because an expression index cannot match a
+# bound parameter.
+receipt_date = func.coalesce(Receipt.date_uploaded, literal_column("'0001-01-01'", Date))
+
+Index("ix_receipt_user_id_upload_order", Receipt.user_id, receipt_date, Receipt.id)
@@ -0,0 +1,102 @@
+"""Loads the receipt extraction runner on demand and tracks its readiness"""
+
+import threading
+
+import pytesseract
+from PIL import Image
+
+from config import (MODEL_PATH, RECEIPT_BACKEND, RECEIPT_BATCH_MAX_SIZE,
+                    RECEIPT_BATCH_MAX_WAIT_MS, RECEIPT_JOB_TIMEOUT_S,
+                    RECEIPT_WARMUP_TIMEOUT_S, RECEIPT_WORKERS, TESSERACT_CMD)
+from models.inference_pool import ReceiptInferencePool
+from models.receipt_batcher import ReceiptBatcher
+
+
+class ReceiptService:
+    """
+    Builds the extraction runner (in-process batcher or worker pool) the
+    first time it is needed, so importing the API never loads torch.
+
+    ``state`` moves from "not_loaded" through "loading" to "ready" once a
+    warm-up inference has succeeded, or to "failed".
+    """
+
+    def __init__(self):
+        self.state = "not_loaded"
+        self.error = None
+        self._runner = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Returns the runner, building and warming it up if necessary."""
+        with self._lock:
+            if self._runner is not None:
+                return self._runner
+
+            self.state, self.error = "loading", None
+            try:
+                runner = self._build()
+                self._warm_up(runner)
+            except Exception as e:
+                self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+                raise
+
+            self._runner, self.state = runner, "ready"
+            return runner
+
+    def load_in_background(self):
+        threading.Thread(target=self._load_quietly,
+                         name="receipt-model-loader", daemon=True).start()
+
+    def submit(self, image, original_size=None):
+        """Queues an image, loading the model first if it is not ready yet."""
+        return self.load().submit(image, original_size)
+
+    def status(self):
+        status = {"state": self.state, "backend": RECEIPT_BACKEND,
+                  "workers": RECEIPT_WORKERS}
+        if self.error:
+            status["error"] = self.error
+        return status
+
+    def close(self):
+        with self._lock:
+            if self._runner is not None:
+                self._runner.close()
+            self._runner, self.state = None, "not_loaded"
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception:
+            pass  # surfaced through status()
+
+    def _build(self):
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+        if RECEIPT_WORKERS > 0:
+            return ReceiptInferencePool(
+                MODEL_PATH,
+                workers=RECEIPT_WORKERS,
+                max_batch_size=RECEIPT_BATCH_MAX_SIZE,
+                job_timeout=RECEIPT_JOB_TIMEOUT_S,
+                backend=RECEIPT_BACKEND,
+                tesseract_cmd=TESSERACT_CMD)
+
+        from models.extract_receipt_data import ReceiptInformationExtractor
+
+        extractor = ReceiptInformationExtractor(
+            path_to_model=MODEL_PATH, backend=RECEIPT_BACKEND)
+        return ReceiptBatcher(
+            extractor.extract_batch,
+            max_batch_size=RECEIPT_BATCH_MAX_SIZE,
+            max_wait_ms=RECEIPT_BATCH_MAX_WAIT_MS)
+
+    def _warm_up(self, runner):
+        blank = Image.new("RGB", (224, 224), "white")
+        try:
+            runner.submit(blank).result(timeout=RECEIPT_WARMUP_TIMEOUT_S)
+        except Exception:
+            runner.close()
+            raise
@@ -0,0 +1,98 @@
+"""Ledger Rollup Model"""
+
+from collections import defaultdict
+from sqlalchemy import (Column, Float, ForeignKey, Integer, String, cast,
+                        extract, func, literal, select, union_all)
+from sqlalchemy.dialects import postgresql, sqlite
+from models.base import Base
+from models.expense_model import Expense
+from models.income_model import Income
+
+INCOME = "income"
+EXPENSE = "expense"
+
+
+class LedgerRollup(Base):
+    """Per-user totals of one income or expense category in one month."""
+    __tablename__ = "ledger_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    tax = Column(Float, nullable=False, default=0.0)
+    entries = Column(Integer, nullable=False, default=0)
+
+
+def rollup_delta(kind, day, category, total, tax=0.0, entries=1):
+    """Change to apply to a rollup row when a ledger entry is added (or removed)."""
+    return {"kind": kind, "year": day.year, "month": day.month,
+            "category": category, "total": total or 0.0, "tax": tax or 0.0,
+            "entries": entries}
+
+
+def negate(delta):
+    return {**delta, "total": -delta["total"], "tax": -delta["tax"],
+            "entries": -delta["entries"]}
+
+
+def upsert_rollups(dialect_name, user_id, deltas):
+    """
+    Builds one INSERT ... ON CONFLICT statement adding ``deltas`` onto the
+    user's rollup rows, merging deltas for the same row first. Rows are
+    written in key order, so concurrent imports lock them in the same order.
+    """
+    merged = defaultdict(lambda: {"total": 0.0, "tax": 0.0, "entries": 0})
+    for delta in deltas:
+        row = merged[(delta["year"], delta["month"], delta["kind"], delta["category"])]
+        row["total"] += delta["total"]
+        row["tax"] += delta["tax"]
+        row["entries"] += delta["entries"]
+
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(LedgerRollup).values([
+        {"user_id": user_id, "year": year, "month": month, "kind": kind,
+         "category": category, **sums}
+        for (year, month, kind, category), sums in sorted(merged.items())])
+    return statement.on_conflict_do_update(
+        index_elements=[LedgerRollup.user_id, LedgerRollup.year, LedgerRollup.month,
+                        LedgerRollup.kind, LedgerRollup.category],
+        set_={
+            "total": LedgerRollup.total + statement.excluded.total,
+            "tax": LedgerRollup.tax + statement.excluded.tax,
+            "entries": LedgerRollup.entries + statement.excluded.entries,
+        })
+
+
+async def apply_rollups(db, user_id, deltas):
+    """Applies rollup deltas inside the caller's (async) transaction."""
+    if deltas:
+        await db.execute(upsert_rollups(db.bind.dialect.name, user_id, deltas))
+
+
+def _year_month(date_column):
+    return (cast(extract("year", date_column), Integer).label("year"),
+            cast(extract("month", date_column), Integer).label("month"))
+
+
+def raw_rollups(user_id=None):
+    """Recomputes the rollup rows from the income and expense tables."""
+    incomes = (
+        select(Income.user_id, *_year_month(Income.date), literal(INCOME).label("kind"),
+               Income.income_category.label("category"),
+               func.coalesce(func.sum(Income.total), 0.0).label("total"),
+               literal(0.0).label("tax"), func.count().label("entries"))
+        .group_by(Income.user_id, "year", "month", Income.income_category))
+    expenses = (
+        select(Expense.user_id, *_year_month(Expense.date), literal(EXPENSE).label("kind"),
+               Expense.expense_category.label("category"),
+               func.coalesce(func.sum(Expense.total), 0.0).label("total"),
+               func.coalesce(func.sum(Expense.tax), 0.0).label("tax"),
+               func.count().label("entries"))
+        .group_by(Expense.user_id, "year", "month", Expense.expense_category))
+    if user_id is not None:
+        incomes = incomes.where(Income.user_id == user_id)
+        expenses = expenses.where(Expense.user_id == user_id)
+    return union_all(incomes, expenses)
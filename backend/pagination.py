@@ -0,0 +1,103 @@
+"""Keyset pagination and filtering for the ledger list endpoints"""
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import date
+from typing import Literal, Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class LedgerPage:
+    """Page size, position and filters requested for a ledger listing."""
+    limit: Optional[int]
+    after: Optional[tuple]
+    date_from: Optional[date]
+    date_to: Optional[date]
+    category: Optional[str]
+    order: str
+
+
+def encode_cursor(day: date, row_id: int) -> str:
+    raw = f"{day.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, row_id = raw.decode().split("|")
+        return date.fromisoformat(day), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def ledger_page(
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE,
+        description="Page size; omit to list every matching row"),
+    cursor: Optional[str] = Query(
+        None, description=f"Value of the {NEXT_CURSOR_HEADER} header of the previous page"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+) -> LedgerPage:
+    """Dependency parsing the pagination and filter query parameters."""
+    return LedgerPage(
+        limit=limit,
+        after=decode_cursor(cursor) if cursor else None,
+        date_from=date_from,
+        date_to=date_to,
+        category=category,
+        order=order,
+    )
+
+
+def paginate(statement, page: LedgerPage, date_column, id_column, category_filter=None):
+    """
+    Applies the page's filters to ``statement`` and orders it by
+    (date, id), seeking past the cursor instead of using OFFSET so every
+    page costs the same however deep it is.
+
+    ``category_filter`` maps a category name to a WHERE clause, for tables
+    that have one. One extra row is fetched to tell whether another page
+    follows; pass the rows to ``page_rows`` to trim it.
+    """
+    if page.date_from is not None:
+        statement = statement.where(date_column >= page.date_from)
+    if page.date_to is not None:
+        statement = statement.where(date_column <= page.date_to)
+    if page.category is not None and category_filter is not None:
+        statement = statement.where(category_filter(page.category))
+
+    key = tuple_(date_column, id_column)
+    if page.order == "asc":
+        if page.after is not None:
+            statement = statement.where(key > tuple_(*page.after))
+        statement = statement.order_by(date_column.asc(), id_column.asc())
+    else:
+        if page.after is not None:
+            statement = statement.where(key < tuple_(*page.after))
+        statement = statement.order_by(date_column.desc(), id_column.desc())
+
+    if page.limit is not None:
+        statement = statement.limit(page.limit + 1)
+    return statement
+
+
+def page_rows(rows, page: LedgerPage, response, row_key):
+    """
+    Trims the look-ahead row and, when another page follows, sets the
+    cursor header from ``row_key(last_row)``, a (date, id) pair.
+    """
+    rows = list(rows)
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*row_key(rows[-1]))
+    return rows
@@ -0,0 +1,68 @@
+"""Password hashing on a dedicated, bounded executor"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from fastapi import HTTPException, status
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on ``workers`` threads of its own so a burst of logins
+    cannot tie up the threadpool shared by every other sync route. Callers
+    await the hash on the event loop; no threadpool thread waits for it.
+
+    At most ``max_pending`` calls wait for a free worker; beyond that
+    callers get a 503 instead of queueing without bound.
+    """
+
+    def __init__(self, workers, max_pending, rounds):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    async def hash(self, password: str) -> bytes:
+        return await self._run(bcrypt.hashpw, password.encode(),
+                         bcrypt.gensalt(rounds=self.rounds))
+
+    async def verify(self, password: str, hashed_password: bytes) -> bool:
+        return await self._run(bcrypt.checkpw, password.encode(), hashed_password)
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        """Whether a hash was made with a different work factor than configured."""
+        # bcrypt hashes look like b"$2b$12$<salt and checksum>"
+        return int(hashed_password.split(b"$")[2]) != self.rounds
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, BCRYPT_ROUNDS)
+
+
+async def hash_password(password: str) -> bytes:
+    return await password_hasher.hash(password)
+
+
+async def verify_password(password: str, hashed_password: bytes) -> bool:
+    return await password_hasher.verify(password, hashed_password)
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    return password_hasher.needs_rehash(hashed_password)
@@ -0,0 +1,18 @@
+"""Shape of the expense records returned to clients"""
+
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import Optional
+
+
+class ExpenseResponse(BaseModel):
+    """An expense record, read from an ORM object or a selected row."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    date: date
+    expense_category: str
+    description: Optional[str] = None
+    total: Optional[float] = None
+    tax: Optional[float] = None
+    user_id: int
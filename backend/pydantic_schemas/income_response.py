@@ -0,0 +1,17 @@
+"""Shape of the income records returned to clients"""
+
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import Optional
+
+
+class IncomeResponse(BaseModel):
+    """An income record, read from an ORM object or a selected row."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    date: date
+    income_category: str
+    description: Optional[str] = None
+    total: Optional[float] = None
+    user_id: int
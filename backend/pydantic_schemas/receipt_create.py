@@ -7,6 +7,7 @@ class ReceiptCreate(BaseModel):
     """Schema for creating a new Receipt."""
     expense_id: Optional[int] = None
     receipt_image: Optional[str] = None
+    image_ref: Optional[str] = None
     date_uploaded: Optional[date] = None
     vendor_name: Optional[str] = None
     total_amount: Optional[float] = None
@@ -0,0 +1,24 @@
+"""Shape of the receipt records returned to clients"""
+
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import Optional
+
+
+class ReceiptResponse(BaseModel):
+    """A receipt record; the image itself is served by /receipt/image."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    expense_id: Optional[int] = None
+    receipt_image: Optional[str] = None
+    image_ref: Optional[str] = None
+    date_uploaded: Optional[date] = None
+    vendor_name: Optional[str] = None
+    total_amount: Optional[float] = None
+
+
+class ReceiptListItem(ReceiptResponse):
+    """A listed receipt, with the tax of the expense it belongs to."""
+    tax: Optional[float] = None
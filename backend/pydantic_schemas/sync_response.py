@@ -0,0 +1,34 @@
+"""Shape of the ledger changes returned by /sync"""
+
+from pydantic import BaseModel
+from pydantic_schemas.expense_response import ExpenseResponse
+from pydantic_schemas.income_response import IncomeResponse
+from pydantic_schemas.receipt_response import ReceiptListItem
+
+
+class IncomeChanges(BaseModel):
+    upserted: list[IncomeResponse] = []
+    deleted: list[int] = []
+
+
+class ExpenseChanges(BaseModel):
+    upserted: list[ExpenseResponse] = []
+    deleted: list[int] = []
+
+
+class ReceiptChanges(BaseModel):
+    upserted: list[ReceiptListItem] = []
+    deleted: list[int] = []
+
+
+class SyncResponse(BaseModel):
+    """
+    Records created or changed, and ids of records deleted, since the
+    client's cursor. Pass ``cursor`` to the next sync; while ``has_more``
+    is true, more changes are waiting.
+    """
+    cursor: int
+    has_more: bool
+    incomes: IncomeChanges
+    expenses: ExpenseChanges
+    receipts: ReceiptChanges
@@ -0,0 +1,13 @@
+"""Shape of the user returned to clients"""
+
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+
+
+class UserResponse(BaseModel):
+    """Public fields of a user; the password hash is never sent back."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: Optional[str] = None
+    name: Optional[str] = None
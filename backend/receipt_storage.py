@@ -0,0 +1,58 @@
+"""Receipt image storage shared by the receipt and expense routes"""
+
+import hashlib
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from config import RECEIPT_BLOB_DIR, RECEIPT_MAX_UPLOAD_BYTES, RECEIPT_THUMBNAIL_SIDE
+from models.blob_store import BlobStore
+from models.receipt_image import decode_data_uri, make_thumbnail
+
+THUMBNAIL = ".thumb.jpg"
+
+receipt_blobs = BlobStore(RECEIPT_BLOB_DIR)
+
+
+def store_receipt_image(contents) -> str:
+    """
+    Stores an image and its thumbnail, returning the image's content hash.
+    Raises OSError when ``contents`` is not a readable image.
+    """
+    digest = hashlib.sha256(contents).hexdigest()
+    if receipt_blobs.exists(digest) and receipt_blobs.exists(digest, THUMBNAIL):
+        return digest
+    thumbnail = make_thumbnail(contents, RECEIPT_THUMBNAIL_SIDE)
+    receipt_blobs.put(contents)
+    receipt_blobs.write(digest, thumbnail, THUMBNAIL)
+    return digest
+
+
+async def save_receipt_image(contents) -> str:
+    if len(contents) > RECEIPT_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large.")
+    try:
+        return await run_in_threadpool(store_receipt_image, contents)
+    except OSError:
+        raise HTTPException(status_code=400, detail="Could not read the receipt image.")
+
+
+async def resolve_receipt_image(receipt_data):
+    """
+    Returns the (receipt_image, image_ref) to store for a ReceiptCreate.
+
+    Inline base64 data URIs are moved into the blob store, so only their
+    reference reaches the database; other receipt_image strings (e.g.
+    links to images hosted elsewhere) are kept as they are.
+    """
+    if receipt_data.image_ref is not None:
+        if not (receipt_blobs.is_digest(receipt_data.image_ref)
+                and receipt_blobs.exists(receipt_data.image_ref)):
+            raise HTTPException(status_code=400, detail="Unknown image_ref")
+        return None, receipt_data.image_ref
+
+    try:
+        contents = decode_data_uri(receipt_data.receipt_image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if contents is None:
+        return receipt_data.receipt_image, None
+    return None, await save_receipt_image(contents)
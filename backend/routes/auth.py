@@ -1,22 +1,39 @@
-import bcrypt
 from fastapi import APIRouter, Depends, HTTPException
-from database import get_db
-from jwt_handler import create_access_token, get_current_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from jwt_handler import (create_access_token, get_current_user, identity_claims,
+                         invalidate_cached_user)
+from models.collection_version_model import PROFILE, bump_versions
 from models.user import User
+from password_hashing import hash_password, needs_rehash, verify_password
 from pydantic_schemas.change_email import ChangeUserEmail
 from pydantic_schemas.change_name import ChangeUserName
 from pydantic_schemas.change_password import ChangeUserPassword
 from pydantic_schemas.user_create import UserCreate
-from sqlalchemy.orm import Session
 from pydantic_schemas.user_login import UserLogin
+from pydantic_schemas.user_response import UserResponse
 
 router = APIRouter()
 
 
-@router.post('/signup', status_code=201)
-def signup_user(user: UserCreate, db: Session = Depends(get_db)):
+async def commit_unique_email(db):
+    """Commits, turning a lost race for an email (ix_users_email) into a 400."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            400,
+            "Email already registered",
+        )
+
+
+@router.post('/signup', status_code=201, response_model=UserResponse)
+async def signup_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Adds a user to db"""
-    user_db = db.query(User).filter(User.email == user.email).first()
+    user_db = await db.scalar(select(User).where(User.email == user.email))
 
     if user_db:
         raise HTTPException(
@@ -24,22 +41,22 @@ def signup_user(user: UserCreate, db: Session = Depends(get_db)):
             "User already exists!",
         )
 
-    hashed_password = bcrypt.hashpw(user.password.encode(), bcrypt.gensalt())
+    hashed_password = await hash_password(user.password)
 
     user_db = User(email=user.email, name=user.name,
                    password=hashed_password)
 
     db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+    await commit_unique_email(db)
+    await db.refresh(user_db)
 
     return user_db
 
 
 @router.post('/login')
-def login_user(user: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Logs in a user"""
-    user_db = db.query(User).filter(User.email == user.email).first()
+    user_db = await db.scalar(select(User).where(User.email == user.email))
 
     if not user_db:
         raise HTTPException(
@@ -47,8 +64,7 @@ def login_user(user: UserLogin, db: Session = Depends(get_db)):
             "User with this email does not exist!",
         )
 
-    is_match = bcrypt.checkpw(user.password.encode(),
-                              user_db.password)
+    is_match = await verify_password(user.password, user_db.password)
 
     if not is_match:
         raise HTTPException(
@@ -56,28 +72,24 @@ def login_user(user: UserLogin, db: Session = Depends(get_db)):
             "Incorrect password!",
         )
 
-    access_token = create_access_token(data={"user_id": user_db.id})
+    if needs_rehash(user_db.password):
+        user_db.password = await hash_password(user.password)
+        await db.commit()
+
+    access_token = create_access_token(data=await identity_claims(user_db, db))
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.get('/fetch_user', status_code=200)
-def fetch_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get('/fetch_user', status_code=200, response_model=UserResponse)
+def fetch_user(current_user: User = Depends(get_current_user)):
     """Gets current user"""
-    user_db = db.query(User).filter(User.id == current_user.id).first()
-
-    if not user_db:
-        raise HTTPException(
-            400,
-            "User with this ID does not exist",
-        )
-
-    return user_db
+    return current_user
 
 
-@router.post('/change_password', status_code=200)
-def change_user_password(user: ChangeUserPassword, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post('/change_password', status_code=200, response_model=UserResponse)
+async def change_user_password(user: ChangeUserPassword, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Changes user password"""
-    user_db = db.query(User).filter(User.id == current_user.id).first()
+    user_db = await db.get(User, current_user.id)
 
     if not user_db:
         raise HTTPException(
@@ -85,20 +97,21 @@ def change_user_password(user: ChangeUserPassword, db: Session = Depends(get_db)
             "User with this ID does not exist",
         )
 
-    hashed_password = bcrypt.hashpw(
-        user.new_password.encode(), bcrypt.gensalt())
+    hashed_password = await hash_password(user.new_password)
     user_db.password = hashed_password
+    await bump_versions(db, user_db.id, PROFILE)
 
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
+    invalidate_cached_user(user_db.id)
 
     return user_db
 
 
-@router.post('/change_email', status_code=200)
-def change_user_password(user: ChangeUserEmail, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post('/change_email', status_code=200, response_model=UserResponse)
+async def change_user_email(user: ChangeUserEmail, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Changes user email"""
-    user_db = db.query(User).filter(User.id == current_user.id).first()
+    user_db = await db.get(User, current_user.id)
 
     if not user_db:
         raise HTTPException(
@@ -107,17 +120,19 @@ def change_user_password(user: ChangeUserEmail, db: Session = Depends(get_db), c
         )
 
     user_db.email = user.new_email
+    await bump_versions(db, user_db.id, PROFILE)
 
-    db.commit()
-    db.refresh(user_db)
+    await commit_unique_email(db)
+    await db.refresh(user_db)
+    invalidate_cached_user(user_db.id)
 
     return user_db
 
 
-@router.post('/change_name', status_code=200)
-def change_user_password(user: ChangeUserName, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post('/change_name', status_code=200, response_model=UserResponse)
+async def change_user_name(user: ChangeUserName, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Changes user name"""
-    user_db = db.query(User).filter(User.id == current_user.id).first()
+    user_db = await db.get(User, current_user.id)
 
     if not user_db:
         raise HTTPException(
@@ -126,8 +141,10 @@ def change_user_password(user: ChangeUserName, db: Session = Depends(get_db), cu
         )
 
     user_db.name = user.new_name
+    await bump_versions(db, user_db.id, PROFILE)
 
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
+    invalidate_cached_user(user_db.id)
 
     return user_db
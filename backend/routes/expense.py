@@ -1,21 +1,29 @@
-from sqlalchemy import func
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import func, insert, select
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models.change_feed_model import record_changes
+from models.collection_version_model import EXPENSES, RECEIPTS, bump_versions
 from models.expense_model import Expense
+from models.rollup_model import EXPENSE, apply_rollups, negate, rollup_delta
 from models.income_model import Income
 from models.receipt_model import Receipt
 from pydantic_schemas.expense_create import ExpenseCreate
+from pydantic_schemas.expense_response import ExpenseResponse
 from jwt_handler import get_current_user
 from models.user import User
+from ledger_import import import_rows
+from receipt_storage import resolve_receipt_image
+from pagination import LedgerPage, ledger_page, page_rows, paginate
+from conditional import not_modified_response
 
 router = APIRouter()
 
 
-@router.post("/add_expense", status_code=201)
-def add_expense_for_user(
+@router.post("/add_expense", status_code=201, response_model=ExpenseResponse)
+async def add_expense_for_user(
     expense_data: ExpenseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     new_expense = Expense(
@@ -28,9 +36,10 @@ def add_expense_for_user(
     )
 
     if expense_data.receipt:
-        print("receipt here")
+        receipt_image, image_ref = await resolve_receipt_image(expense_data.receipt)
         new_receipt = Receipt(
-            receipt_image=expense_data.receipt.receipt_image,
+            receipt_image=receipt_image,
+            image_ref=image_ref,
             date_uploaded=expense_data.receipt.date_uploaded,
             vendor_name=expense_data.receipt.vendor_name,
             total_amount=expense_data.receipt.total_amount,
@@ -39,38 +48,96 @@ def add_expense_for_user(
         new_expense.receipts.append(new_receipt)
 
     db.add(new_expense)
-    db.commit()
-    db.refresh(new_expense)
+    await db.flush()
+    await apply_rollups(db, current_user.id, [rollup_delta(
+        EXPENSE, new_expense.date, new_expense.expense_category,
+        new_expense.total, new_expense.tax)])
+    await bump_versions(db, current_user.id, EXPENSES,
+                        *([RECEIPTS] if expense_data.receipt else []))
+    await record_changes(db, current_user.id, EXPENSES, [new_expense.id], created=True)
+    if expense_data.receipt:
+        await record_changes(db, current_user.id, RECEIPTS, [new_receipt.id], created=True)
+    await db.commit()
+    await db.refresh(new_expense)
     return new_expense
 
 
+@router.post("/import_expenses", status_code=200)
+async def import_expenses_for_user(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk-inserts expenses from a CSV file (header row of ExpenseCreate
+    fields) or a JSON array of ExpenseCreate objects, committing in chunks
+    and reporting every invalid row. Attached receipts are not imported.
+    """
+    user_id = current_user.id
+
+    async def insert_chunk(expenses):
+        expense_ids = await db.scalars(insert(Expense).returning(Expense.id), [
+            {**expense.model_dump(exclude={"receipt"}), "user_id": user_id}
+            for expense in expenses])
+        await apply_rollups(db, user_id, [
+            rollup_delta(EXPENSE, expense.date, expense.expense_category,
+                         expense.total, expense.tax)
+            for expense in expenses])
+        await bump_versions(db, user_id, EXPENSES)
+        await record_changes(db, user_id, EXPENSES, expense_ids.all(), created=True)
+        await db.commit()
+
+    return await import_rows(file, ExpenseCreate, insert_chunk)
+
+
 @router.delete("/delete_expense/{expense_id}", status_code=200)
-def delete_expense_for_user(
+async def delete_expense_for_user(
     expense_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    expense = db.query(Expense).filter(
-        Expense.id == expense_id, Expense.user_id == current_user.id).first()
-
-    receipt = db.query(Receipt).filter(Receipt.expense_id ==
-                                       expense_id, Receipt.user_id == current_user.id).first()
+    expense = await db.scalar(select(Expense).where(
+        Expense.id == expense_id, Expense.user_id == current_user.id))
 
     if not expense:
         raise HTTPException(status_code=404, detail="Expense record not found")
 
-    if receipt:
-        db.delete(receipt)
+    # Deleting the expense cascades to every receipt attached to it
+    receipt_ids = (await db.scalars(select(Receipt.id).where(
+        Receipt.expense_id == expense_id, Receipt.user_id == current_user.id))).all()
 
-    db.delete(expense)
-    db.commit()
+    await db.delete(expense)
+    await db.flush()
+    await apply_rollups(db, current_user.id, [negate(rollup_delta(
+        EXPENSE, expense.date, expense.expense_category, expense.total, expense.tax))])
+    await bump_versions(db, current_user.id, EXPENSES, *([RECEIPTS] if receipt_ids else []))
+    await record_changes(db, current_user.id, EXPENSES, [expense.id], deleted=True)
+    await record_changes(db, current_user.id, RECEIPTS, receipt_ids, deleted=True)
+    await db.commit()
 
     return {"detail": "Expense deleted successfully"}
 
 
-@router.get("/get_expenses", status_code=200)
-def get_expenses_for_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    expense_list = db.query(Expense).filter(
-        Expense.user_id == current_user.id).all()
+@router.get("/get_expenses", status_code=200, response_model=list[ExpenseResponse])
+async def get_expenses_for_user(
+    request: Request,
+    response: Response,
+    page: LedgerPage = Depends(ledger_page),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    not_modified = await not_modified_response(
+        request, response, db, current_user.id, EXPENSES)
+    if not_modified:
+        return not_modified
+
+    statement = paginate(
+        select(Expense.id, Expense.date, Expense.expense_category, Expense.description,
+               Expense.total, Expense.tax, Expense.user_id)
+        .where(Expense.user_id == current_user.id),
+        page, Expense.date, Expense.id,
+        category_filter=lambda category: Expense.expense_category == category)
+    expense_list = (await db.execute(statement)).all()
 
-    return expense_list
+    return page_rows(expense_list, page, response,
+                     lambda expense: (expense.date, expense.id))
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from typing import Literal
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from config import EXPORT_CHUNK_SIZE
+from database import async_engine
+from jwt_handler import get_current_user
+from models.expense_model import Expense
+from models.income_model import Income
+from models.receipt_model import Receipt
+from models.user import User
+
+router = APIRouter()
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def export_query(collection, user_id):
+    """Columns exported for each collection, oldest first."""
+    if collection == "incomes":
+        return (select(Income.id, Income.date, Income.income_category,
+                       Income.description, Income.total)
+                .where(Income.user_id == user_id)
+                .order_by(Income.date, Income.id))
+    if collection == "expenses":
+        return (select(Expense.id, Expense.date, Expense.expense_category,
+                       Expense.description, Expense.total, Expense.tax)
+                .where(Expense.user_id == user_id)
+                .order_by(Expense.date, Expense.id))
+    return (select(Receipt.id, Receipt.expense_id, Receipt.date_uploaded,
+                   Receipt.vendor_name, Receipt.total_amount, Expense.tax)
+            .outerjoin(Expense, Receipt.expense_id == Expense.id)
+            .where(Receipt.user_id == user_id)
+            .order_by(Receipt.date_uploaded, Receipt.id))
+
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(columns, rows):
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+    ).encode()
+
+
+async def stream_rows(statement, export_format):
+    """
+    Streams a query from a server-side cursor, encoding and sending
+    ``EXPORT_CHUNK_SIZE`` rows at a time so memory use stays flat.
+    """
+    columns = [column.name for column in statement.selected_columns]
+    if export_format == "csv":
+        yield encode_csv([columns])
+
+    async with async_engine.connect() as connection:
+        result = await connection.stream(
+            statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions(EXPORT_CHUNK_SIZE):
+            if export_format == "csv":
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(columns, rows)
+
+
+@router.get("/{collection}", status_code=200)
+async def export_ledger(
+    collection: Literal["incomes", "expenses", "receipts"],
+    format: Literal["csv", "ndjson"] = "csv",
+    current_user: User = Depends(get_current_user)
+):
+    """Downloads the user's whole income, expense or receipt history."""
+    statement = export_query(collection, current_user.id)
+    extension = "csv" if format == "csv" else "ndjson"
+    return StreamingResponse(
+        stream_rows(statement, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{extension}"'},
+    )
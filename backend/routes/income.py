@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models.change_feed_model import record_changes
+from models.collection_version_model import INCOMES, bump_versions
 from models.income_model import Income
+from models.rollup_model import INCOME, apply_rollups, negate, rollup_delta
 from pydantic_schemas.income_create import IncomeCreate
+from pydantic_schemas.income_response import IncomeResponse
 from jwt_handler import get_current_user
 from models.user import User
+from ledger_import import import_rows
+from pagination import LedgerPage, ledger_page, page_rows, paginate
+from conditional import not_modified_response
 
 router = APIRouter()
 
 
-@router.post("/add_income", status_code=201)
-def add_income_for_user(
+@router.post("/add_income", status_code=201, response_model=IncomeResponse)
+async def add_income_for_user(
     income_data: IncomeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     new_income = Income(
@@ -23,31 +31,84 @@ def add_income_for_user(
         user_id=current_user.id
     )
     db.add(new_income)
-    db.commit()
-    db.refresh(new_income)
+    await db.flush()
+    await apply_rollups(db, current_user.id, [rollup_delta(
+        INCOME, new_income.date, new_income.income_category, new_income.total)])
+    await bump_versions(db, current_user.id, INCOMES)
+    await record_changes(db, current_user.id, INCOMES, [new_income.id], created=True)
+    await db.commit()
+    await db.refresh(new_income)
     return new_income
 
 
+@router.post("/import_incomes", status_code=200)
+async def import_incomes_for_user(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk-inserts incomes from a CSV file (header row of IncomeCreate
+    fields) or a JSON array of IncomeCreate objects, committing in chunks
+    and reporting every invalid row.
+    """
+    user_id = current_user.id
+
+    async def insert_chunk(incomes):
+        income_ids = await db.scalars(insert(Income).returning(Income.id), [
+            {**income.model_dump(), "user_id": user_id} for income in incomes])
+        await apply_rollups(db, user_id, [
+            rollup_delta(INCOME, income.date, income.income_category, income.total)
+            for income in incomes])
+        await bump_versions(db, user_id, INCOMES)
+        await record_changes(db, user_id, INCOMES, income_ids.all(), created=True)
+        await db.commit()
+
+    return await import_rows(file, IncomeCreate, insert_chunk)
+
+
 @router.delete("/delete_income/{income_id}", status_code=200)
-def delete_income_for_user(
+async def delete_income_for_user(
     income_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    income = db.query(Income).filter(Income.id == income_id,
-                                     Income.user_id == current_user.id).first()
+    income = await db.scalar(select(Income).where(
+        Income.id == income_id, Income.user_id == current_user.id))
 
     if not income:
         raise HTTPException(status_code=404, detail="Income record not found")
 
-    db.delete(income)
-    db.commit()
+    await db.delete(income)
+    await db.flush()
+    await apply_rollups(db, current_user.id, [negate(rollup_delta(
+        INCOME, income.date, income.income_category, income.total))])
+    await bump_versions(db, current_user.id, INCOMES)
+    await record_changes(db, current_user.id, INCOMES, [income.id], deleted=True)
+    await db.commit()
 
     return {"detail": "Income deleted successfully"}
 
 
-@router.get("/get_incomes", status_code=200)
-def get_incomes_for_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    income_list = db.query(Income).filter(
-        Income.user_id == current_user.id).all()
-    return income_list
+@router.get("/get_incomes", status_code=200, response_model=list[IncomeResponse])
+async def get_incomes_for_user(
+    request: Request,
+    response: Response,
+    page: LedgerPage = Depends(ledger_page),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    not_modified = await not_modified_response(
+        request, response, db, current_user.id, INCOMES)
+    if not_modified:
+        return not_modified
+
+    statement = paginate(
+        select(Income.id, Income.date, Income.income_category, Income.description,
+               Income.total, Income.user_id)
+        .where(Income.user_id == current_user.id),
+        page, Income.date, Income.id,
+        category_filter=lambda category: Income.income_category == category)
+    income_list = (await db.execute(statement)).all()
+    return page_rows(income_list, page, response,
+                     lambda income: (income.date, income.id))
@@ -1,94 +1,145 @@
-import io
-from PIL import Image
-from models.extract_receipt_data import ReceiptInformationExtractor
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from database import get_db
-from models.income_model import Income
-from models.receipt_model import Receipt
-from pydantic_schemas.expense_create import ExpenseCreate
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import RECEIPT_MAX_UPLOAD_BYTES
+from database import get_async_db
+from models.change_feed_model import record_changes
+from models.collection_version_model import RECEIPTS, bump_versions
+from models.expense_model import Expense
+from models.receipt_image import UploadTooLarge, image_media_type, read_upload
+from models.receipt_model import Receipt, receipt_date
 from jwt_handler import get_current_user
 from models.user import User
+from pagination import LedgerPage, ledger_page, page_rows, paginate
+from conditional import not_modified_response
 from pydantic_schemas.receipt_create import ReceiptCreate
-
-# temp workaround
-import pytesseract
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from pydantic_schemas.receipt_response import ReceiptListItem, ReceiptResponse
+from receipt_storage import (THUMBNAIL, receipt_blobs, resolve_receipt_image,
+                             save_receipt_image)
 
 router = APIRouter()
-receipt_extractor = ReceiptInformationExtractor(
-    path_to_model="D:\\FYP\\TaxifyF\\taxify\\backend\\model")
-
-
-@router.post("/extract")
-async def extract_receipt(file: UploadFile = File(...)):
-    """Extract receipt information from an uploaded image."""
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400, detail="Invalid file format. Please upload an image.")
-
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents)).convert("RGB")
 
-    result = receipt_extractor(image)
-    return result
 
-
-@router.post("/add_receipt", status_code=201)
-def add_receipt_for_user(
+@router.post("/add_receipt", status_code=201, response_model=ReceiptResponse)
+async def add_receipt_for_user(
     receipt_data: ReceiptCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
+    receipt_image, image_ref = await resolve_receipt_image(receipt_data)
     new_receipt = Receipt(
         expense_id=receipt_data.expense_id,
-        receipt_image=receipt_data.receipt_image,
+        receipt_image=receipt_image,
+        image_ref=image_ref,
         date_uploaded=receipt_data.date_uploaded,
         vendor_name=receipt_data.vendor_name,
         total_amount=receipt_data.total_amount,
         user_id=current_user.id
     )
     db.add(new_receipt)
-    db.commit()
-    db.refresh(new_receipt)
+    await db.flush()
+    await bump_versions(db, current_user.id, RECEIPTS)
+    await record_changes(db, current_user.id, RECEIPTS, [new_receipt.id], created=True)
+    await db.commit()
+    await db.refresh(new_receipt)
     return new_receipt
 
 
+@router.post("/upload_image", status_code=201)
+async def upload_receipt_image(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stores a receipt image and returns its image_ref, to pass to
+    add_receipt (or an expense's receipt) instead of inline image data.
+    """
+    try:
+        contents = await read_upload(file, RECEIPT_MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Image is too large.")
+    return {"image_ref": await save_receipt_image(contents)}
+
+
+@router.get("/image/{receipt_id}", response_class=FileResponse)
+async def get_receipt_image(
+    receipt_id: int,
+    variant: Literal["original", "thumbnail"] = "original",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Streams a receipt's stored image, or its JPEG thumbnail."""
+    image_ref = await db.scalar(select(Receipt.image_ref).where(
+        Receipt.id == receipt_id, Receipt.user_id == current_user.id))
+    if not image_ref:
+        raise HTTPException(status_code=404, detail="Receipt image not found")
+
+    if variant == "thumbnail":
+        path, media_type = receipt_blobs.path(image_ref, THUMBNAIL), "image/jpeg"
+    else:
+        path = receipt_blobs.path(image_ref)
+        media_type = await run_in_threadpool(image_media_type, path)
+    # Content-addressed, so the bytes behind a receipt never change
+    return FileResponse(path, media_type=media_type, headers={
+        "Cache-Control": "private, max-age=31536000, immutable"})
+
+
 @router.delete("/delete_receipt/{receipt_id}", status_code=200)
-def delete_receipt_for_user(
+async def delete_receipt_for_user(
     receipt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    receipt = db.query(Receipt).filter(Receipt.id == receipt_id,
-                                       Receipt.user_id == current_user.id).first()
+    receipt = await db.scalar(select(Receipt).where(
+        Receipt.id == receipt_id, Receipt.user_id == current_user.id))
 
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt record not found")
 
-    db.delete(receipt)
-    db.commit()
+    await db.delete(receipt)
+    await db.flush()
+    await bump_versions(db, current_user.id, RECEIPTS)
+    await record_changes(db, current_user.id, RECEIPTS, [receipt.id], deleted=True)
+    await db.commit()
 
     return {"detail": "Receipt deleted successfully"}
 
 
-@router.get("/get_receipts", status_code=200)
-def get_receipt_for_user(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    receipt_list = db.query(Receipt).filter(
-        Receipt.user_id == current_user.id).all()
-
-    results = []
-    for receipt in receipt_list:
-        receipt_data = {
-            "id": receipt.id,
-            "user_id": receipt.user_id,
-            "expense_id": receipt.expense_id,
-            "receipt_image": receipt.receipt_image,
-            "date_uploaded": receipt.date_uploaded,
-            "vendor_name": receipt.vendor_name,
-            "total_amount": receipt.total_amount,
-            "tax": receipt.expense.tax if receipt.expense else None,
-        }
-        results.append(receipt_data)
-
-    return results
+@router.get("/get_receipts", status_code=200, response_model=list[ReceiptListItem])
+async def get_receipt_for_user(
+    request: Request,
+    response: Response,
+    page: LedgerPage = Depends(ledger_page),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    not_modified = await not_modified_response(
+        request, response, db, current_user.id, RECEIPTS)
+    if not_modified:
+        return not_modified
+
+    # One joined, column-projected query; no ORM objects or per-row loads
+    statement = paginate(
+        select(
+            Receipt.id,
+            Receipt.user_id,
+            Receipt.expense_id,
+            Receipt.receipt_image,
+            Receipt.image_ref,
+            Receipt.date_uploaded,
+            Receipt.vendor_name,
+            Receipt.total_amount,
+            Expense.tax,
+        )
+        .outerjoin(Expense, Receipt.expense_id == Expense.id)
+        .where(Receipt.user_id == current_user.id),
+        page, receipt_date, Receipt.id,
+        category_filter=lambda category: Expense.expense_category == category)
+    rows = (await db.execute(statement)).all()
+
+    return page_rows(rows, page, response,
+                     lambda row: (row.date_uploaded or date.min, row.id))
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from config import (MODEL_PATH, RECEIPT_BACKEND, RECEIPT_CACHE_DIR,
+                    RECEIPT_CACHE_SIZE, RECEIPT_JOB_CONCURRENCY,
+                    RECEIPT_JOB_LEASE_S, RECEIPT_JOB_MAX_WAIT_S,
+                    RECEIPT_JOB_QUEUE_LIMIT, RECEIPT_JOB_TTL_S, RECEIPT_JOBS_DB,
+                    RECEIPT_MAX_IMAGE_SIDE, RECEIPT_MAX_UPLOAD_BYTES)
+from models.receipt_cache import ReceiptCache, image_key, model_version
+from models.receipt_image import UploadTooLarge, load_receipt_image, read_upload
+from models.receipt_jobs import JobQueueFull, ReceiptJobQueue
+from models.receipt_service import ReceiptService
+from metrics import stage_timer
+
+router = APIRouter()
+
+receipt_service = ReceiptService()
+receipt_cache = ReceiptCache(
+    max_entries=RECEIPT_CACHE_SIZE, directory=RECEIPT_CACHE_DIR)
+receipt_model_version = f"{model_version(MODEL_PATH)}-{RECEIPT_BACKEND}"
+
+
+def decode_image(contents):
+    with stage_timer("decode"):
+        image, original_size = load_receipt_image(contents, RECEIPT_MAX_IMAGE_SIDE)
+    return image, original_size, image_key(image, receipt_model_version)
+
+
+def run_extraction(contents):
+    """Extracts an uploaded image synchronously, going through the cache."""
+    image, original_size, cache_key = decode_image(contents)
+    result = receipt_cache.get(cache_key)
+    if result is None:
+        with stage_timer("inference"):
+            result = receipt_service.submit(image, original_size).result()
+        receipt_cache.put(cache_key, result)
+    return result
+
+
+receipt_jobs = ReceiptJobQueue(
+    RECEIPT_JOBS_DB,
+    run_extraction,
+    concurrency=RECEIPT_JOB_CONCURRENCY,
+    ttl=RECEIPT_JOB_TTL_S,
+    max_queued=RECEIPT_JOB_QUEUE_LIMIT,
+    lease=RECEIPT_JOB_LEASE_S)
+
+
+async def read_image_upload(file):
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=400, detail="Invalid file format. Please upload an image.")
+
+    try:
+        return await read_upload(file, RECEIPT_MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413, detail="Image is too large.")
+
+
+@router.post("/extract")
+async def extract_receipt(file: UploadFile = File(...)):
+    """Extract receipt information from an uploaded image."""
+    contents = await read_image_upload(file)
+
+    try:
+        image, original_size, cache_key = await run_in_threadpool(
+            decode_image, contents)
+    except OSError:
+        raise HTTPException(
+            status_code=400, detail="Could not read the uploaded image.")
+
+    result = await run_in_threadpool(receipt_cache.get, cache_key)
+    if result is not None:
+        return result
+
+    try:
+        future = await run_in_threadpool(
+            receipt_service.submit, image, original_size)
+    except Exception:
+        raise HTTPException(
+            status_code=503, detail="Receipt model is not available")
+
+    try:
+        with stage_timer("inference"):
+            result = await asyncio.wrap_future(future)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=504, detail="Receipt extraction timed out")
+
+    await run_in_threadpool(receipt_cache.put, cache_key, result)
+    return result
+
+
+@router.post("/jobs", status_code=202)
+async def submit_receipt_job(file: UploadFile = File(...)):
+    """Queues an image for extraction and returns the job id right away."""
+    contents = await read_image_upload(file)
+
+    try:
+        job_id = await run_in_threadpool(receipt_jobs.submit, contents)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Too many receipts are waiting, retry later",
+            headers={"Retry-After": "5"})
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}", status_code=200)
+async def get_receipt_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=RECEIPT_JOB_MAX_WAIT_S,
+                        description="Seconds to hold the request until the job finishes"),
+):
+    """Returns a job's status, long-polling for up to ``wait`` seconds."""
+    deadline = time.monotonic() + wait
+    while True:
+        job = await run_in_threadpool(receipt_jobs.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Receipt job not found")
+        if job["status"] in ("done", "failed") or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(receipt_jobs.poll_interval)
+
+
+@router.get("/cache_stats", status_code=200)
+def get_receipt_cache_stats():
+    """Reports hit and miss counters of the extraction result cache."""
+    return receipt_cache.stats()
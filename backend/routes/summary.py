@@ -0,0 +1,57 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from jwt_handler import get_current_user
+from models.rollup_model import LedgerRollup
+from models.user import User
+
+router = APIRouter()
+
+
+def rollup_filters(statement, user_id, year, kind):
+    statement = statement.where(
+        LedgerRollup.user_id == user_id, LedgerRollup.entries > 0)
+    if year is not None:
+        statement = statement.where(LedgerRollup.year == year)
+    if kind is not None:
+        statement = statement.where(LedgerRollup.kind == kind)
+    return statement
+
+
+@router.get("/monthly", status_code=200)
+async def get_monthly_summary(
+    year: Optional[int] = None,
+    kind: Optional[Literal["income", "expense"]] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Income and expense totals per month and category, oldest first."""
+    statement = rollup_filters(
+        select(LedgerRollup.year, LedgerRollup.month, LedgerRollup.kind,
+               LedgerRollup.category, LedgerRollup.total, LedgerRollup.tax,
+               LedgerRollup.entries),
+        current_user.id, year, kind)
+    statement = statement.order_by(
+        LedgerRollup.year, LedgerRollup.month, LedgerRollup.kind, LedgerRollup.category)
+    return [dict(row) for row in (await db.execute(statement)).mappings()]
+
+
+@router.get("/categories", status_code=200)
+async def get_category_summary(
+    year: Optional[int] = None,
+    kind: Optional[Literal["income", "expense"]] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Income and expense totals per category, over one year or all time."""
+    statement = rollup_filters(
+        select(LedgerRollup.kind, LedgerRollup.category,
+               func.sum(LedgerRollup.total).label("total"),
+               func.sum(LedgerRollup.tax).label("tax"),
+               func.sum(LedgerRollup.entries).label("entries")),
+        current_user.id, year, kind)
+    statement = (statement.group_by(LedgerRollup.kind, LedgerRollup.category)
+                 .order_by(LedgerRollup.kind, LedgerRollup.category))
+    return [dict(row) for row in (await db.execute(statement)).mappings()]
@@ -0,0 +1,74 @@
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from jwt_handler import get_current_user
+from models.change_feed_model import LedgerChange
+from models.collection_version_model import CHANGES, EXPENSES, INCOMES, RECEIPTS, get_version
+from models.expense_model import Expense
+from models.income_model import Income
+from models.receipt_model import Receipt
+from models.user import User
+from pagination import MAX_PAGE_SIZE
+from pydantic_schemas.sync_response import SyncResponse
+
+router = APIRouter()
+
+# The same columns as the list endpoints return, per collection
+RECORD_QUERIES = {
+    INCOMES: (Income, select(
+        Income.id, Income.date, Income.income_category, Income.description,
+        Income.total, Income.user_id)),
+    EXPENSES: (Expense, select(
+        Expense.id, Expense.date, Expense.expense_category, Expense.description,
+        Expense.total, Expense.tax, Expense.user_id)),
+    RECEIPTS: (Receipt, select(
+        Receipt.id, Receipt.user_id, Receipt.expense_id, Receipt.receipt_image,
+        Receipt.image_ref, Receipt.date_uploaded, Receipt.vendor_name,
+        Receipt.total_amount, Expense.tax)
+        .outerjoin(Expense, Receipt.expense_id == Expense.id)),
+}
+
+
+@router.get("", status_code=200, response_model=SyncResponse)
+async def sync_ledger(
+    cursor: int = Query(0, ge=0, description="cursor of the previous sync; 0 for everything"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE,
+                       description="Most changes to return"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Incomes, expenses and receipts created, changed or deleted since
+    ``cursor``, read from the change feed, so a sync costs in proportion to
+    what changed rather than to the size of the ledger.
+    """
+    changes = (await db.execute(
+        select(LedgerChange.seq, LedgerChange.collection, LedgerChange.record_id,
+               LedgerChange.deleted)
+        .where(LedgerChange.user_id == current_user.id, LedgerChange.seq > cursor)
+        .order_by(LedgerChange.seq)
+        .limit(limit + 1))).all()
+
+    if not changes and cursor > await get_version(db, current_user.id, CHANGES):
+        raise HTTPException(
+            status_code=410, detail="Cursor is ahead of the change feed; sync again from 0")
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    upserted, deleted = defaultdict(list), defaultdict(list)
+    for change in changes:
+        (deleted if change.deleted else upserted)[change.collection].append(change.record_id)
+
+    body = {"cursor": changes[-1].seq if changes else cursor, "has_more": has_more}
+    for collection, (model, statement) in RECORD_QUERIES.items():
+        records = []
+        if upserted[collection]:
+            # A record deleted since the feed was read is skipped; its
+            # tombstone comes with a later sync
+            records = (await db.execute(statement.where(
+                model.user_id == current_user.id,
+                model.id.in_(upserted[collection])))).all()
+        body[collection] = {"upserted": records, "deleted": deleted[collection]}
+    return body
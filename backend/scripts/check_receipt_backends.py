@@ -0,0 +1,89 @@
+"""
+Compares the fields extracted by an optimized receipt model backend with
+the fp32 eager model on a set of sample images.
+
+Run from the backend directory:
+    python -m scripts.check_receipt_backends --backend int8 img.jpg samples/
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pytesseract
+from PIL import Image
+
+from models.extract_receipt_data import BACKENDS, ReceiptInformationExtractor
+
+FIELDS = ("company", "date", "address", "total", "tax")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+
+
+def collect_images(paths):
+    """Expands directories into the image files they contain."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            images.append(path)
+    return images
+
+
+def run(extractor, images):
+    """Extracts every image, returning the results and seconds per image."""
+    results = []
+    start = time.perf_counter()
+    for image in images:
+        results.append(extractor(image))
+    return results, (time.perf_counter() - start) / max(1, len(images))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("samples", nargs="*", default=["img.jpg"],
+                        help="sample images or directories of images")
+    parser.add_argument("--model", default="model")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "eager"],
+                        default="int8")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="fail when fewer fields than this fraction match")
+    parser.add_argument("--tesseract-cmd")
+    args = parser.parse_args()
+
+    if args.tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+
+    paths = collect_images(args.samples)
+    if not paths:
+        parser.error("no sample images found")
+    images = [Image.open(path).convert("RGB") for path in paths]
+
+    reference, reference_time = run(
+        ReceiptInformationExtractor(args.model, "eager"), images)
+    candidate_extractor = ReceiptInformationExtractor(args.model, args.backend)
+    candidate_extractor(images[0])  # exclude one-off tracing from the timing
+    candidate, candidate_time = run(candidate_extractor, images)
+
+    matches = {field: 0 for field in FIELDS}
+    for path, expected, actual in zip(paths, reference, candidate):
+        for field in FIELDS:
+            if expected[field] == actual[field]:
+                matches[field] += 1
+            else:
+                print(f"{path}: {field} {expected[field]!r} != {actual[field]!r}")
+
+    for field in FIELDS:
+        print(f"{field:>8}: {matches[field]}/{len(paths)} match")
+    agreement = sum(matches.values()) / (len(FIELDS) * len(paths))
+    print(f"agreement {agreement:.2%}, eager {reference_time * 1000:.0f} ms/image, "
+          f"{args.backend} {candidate_time * 1000:.0f} ms/image")
+
+    return 0 if agreement >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
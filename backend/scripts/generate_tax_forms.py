@@ -0,0 +1,135 @@
+"""
+Generates the filled tax form PDF of every user with ledger entries.
+
+Form values for all users come from one grouped query over the ledger
+rollups; PDFs are rendered on a process pool and written to the output
+directory as <user_id>.pdf. Finished forms are recorded in a manifest, so
+an interrupted run picks up where it stopped, and a form is only rendered
+again when the user's figures have changed since.
+
+Run from the backend directory:
+    python -m scripts.generate_tax_forms out/2025 --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import and_, func, or_, select
+
+from config import TAX_FORM_LOCK
+from database import engine
+from models.rollup_model import EXPENSE, INCOME, LedgerRollup
+from tax_forms import TaxFormRenderer, form_data, form_digest
+
+import models.user
+import models.receipt_model
+
+MANIFEST = "manifest.jsonl"
+
+_renderer = None
+
+
+def load_form_data(connection, user_ids=None):
+    """Returns {user_id: form values} for every user, from one grouped query."""
+    statement = (
+        select(LedgerRollup.user_id, LedgerRollup.kind, LedgerRollup.category,
+               func.sum(LedgerRollup.total))
+        .where(or_(and_(LedgerRollup.kind == INCOME, LedgerRollup.category == "Salary"),
+                   LedgerRollup.kind == EXPENSE),
+               LedgerRollup.entries > 0)
+        .group_by(LedgerRollup.user_id, LedgerRollup.kind, LedgerRollup.category))
+    if user_ids:
+        statement = statement.where(LedgerRollup.user_id.in_(user_ids))
+
+    salaries, expenses = defaultdict(float), defaultdict(list)
+    for user_id, kind, category, total in connection.execute(statement):
+        if kind == INCOME:
+            salaries[user_id] += total
+        else:
+            expenses[user_id].append((category, total))
+    return {user_id: form_data(salaries[user_id], expenses[user_id])
+            for user_id in sorted(salaries.keys() | expenses.keys())}
+
+
+def load_manifest(path):
+    """Returns {user_id: digest} of the forms a previous run finished."""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line of an interrupted run
+                done[entry["user_id"]] = entry["digest"]
+    return done
+
+
+def _init_worker(lock_path):
+    global _renderer
+    # pdfFiller's file handling is unknown, so renders keep the host-wide
+    # lock the API takes; only the rest of each task runs in parallel
+    _renderer = TaxFormRenderer(lock_path, max_entries=0)
+
+
+def _render(user_id, data, path):
+    pdf = _renderer.render(user_id, data)
+    with open(path + ".tmp", "wb") as f:
+        f.write(pdf)
+    os.replace(path + ".tmp", path)
+    return user_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="only these users (repeatable)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST)
+    done = load_manifest(manifest_path)
+
+    with engine.connect() as connection:
+        forms = load_form_data(connection, args.user_ids)
+    pending = {user_id: (data, form_digest(data)) for user_id, data in forms.items()
+               if done.get(user_id) != form_digest(data)}
+    print(f"{len(forms)} users, {len(forms) - len(pending)} already done, "
+          f"{len(pending)} to render")
+
+    failed = 0
+    start = time.perf_counter()
+    with open(manifest_path, "a") as manifest, ProcessPoolExecutor(
+            max_workers=args.workers, initializer=_init_worker,
+            initargs=(TAX_FORM_LOCK,)) as pool:
+        futures = {
+            pool.submit(_render, user_id, data,
+                        os.path.join(args.output_dir, f"{user_id}.pdf")): (user_id, digest)
+            for user_id, (data, digest) in pending.items()}
+        for count, future in enumerate(as_completed(futures), start=1):
+            user_id, digest = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"user {user_id}: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                manifest.write(json.dumps({"user_id": user_id, "digest": digest}) + "\n")
+                manifest.flush()
+            if count % 100 == 0 or count == len(futures):
+                elapsed = time.perf_counter() - start
+                print(f"[{count}/{len(futures)}] {count / elapsed:.1f} forms/s, "
+                      f"{failed} failed")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
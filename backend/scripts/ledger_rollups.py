@@ -0,0 +1,79 @@
+"""
+Rebuilds the ledger_rollup table from the income and expense rows, or
+checks that it still matches them.
+
+Run from the backend directory:
+    python -m scripts.ledger_rollups verify
+    python -m scripts.ledger_rollups rebuild --user-id 42
+"""
+
+import argparse
+import math
+import sys
+
+from sqlalchemy import delete, select
+
+from database import engine
+from models.rollup_model import LedgerRollup, raw_rollups
+
+import models.user
+import models.receipt_model
+
+KEY = ("user_id", "year", "month", "kind", "category")
+COLUMNS = KEY + ("total", "tax", "entries")
+
+
+def rebuild(connection, user_id=None):
+    """Replaces the stored rollups (of one user, or everyone) with recomputed ones."""
+    statement = delete(LedgerRollup)
+    if user_id is not None:
+        statement = statement.where(LedgerRollup.user_id == user_id)
+    connection.execute(statement)
+    connection.execute(LedgerRollup.__table__.insert().from_select(
+        COLUMNS, raw_rollups(user_id)))
+
+
+def verify(connection, user_id=None, tolerance=0.01):
+    """Returns (key, stored, expected) for every rollup row that is off."""
+    stored_query = select(*(getattr(LedgerRollup, column) for column in COLUMNS))
+    if user_id is not None:
+        stored_query = stored_query.where(LedgerRollup.user_id == user_id)
+
+    def by_key(rows):
+        return {tuple(row[:len(KEY)]): tuple(row[len(KEY):]) for row in rows}
+
+    stored = by_key(connection.execute(stored_query))
+    expected = by_key(connection.execute(raw_rollups(user_id)))
+
+    mismatches = []
+    for key in stored.keys() | expected.keys():
+        have = stored.get(key, (0.0, 0.0, 0))
+        want = expected.get(key, (0.0, 0.0, 0))
+        if (have[2] != want[2]
+                or not math.isclose(have[0], want[0], abs_tol=tolerance)
+                or not math.isclose(have[1], want[1], abs_tol=tolerance)):
+            mismatches.append((key, have, want))
+    return sorted(mismatches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        if args.command == "rebuild":
+            rebuild(connection, args.user_id)
+            print("Rollups rebuilt")
+            return 0
+
+        mismatches = verify(connection, args.user_id)
+    for key, have, want in mismatches:
+        print(f"{dict(zip(KEY, key))}: stored (total, tax, entries)={have}, expected={want}")
+    print(f"{len(mismatches)} mismatched rollup rows")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Moves inline base64 receipt images out of receipt.receipt_image and into
+the receipt blob store, leaving only their image_ref in the table.
+
+Run from the backend directory, after migration 0004:
+    python -m scripts.move_receipt_images --batch-size 200
+"""
+
+import argparse
+import sys
+
+from collections import defaultdict
+
+from sqlalchemy import insert, select, update
+
+from database import engine
+from models.change_feed_model import (LedgerChange, change_rows, next_seq_statement,
+                                      supersede_statement)
+from models.collection_version_model import RECEIPTS, bump_statement
+from models.receipt_image import decode_data_uri
+from models.receipt_model import Receipt
+from receipt_storage import store_receipt_image
+
+import models.user
+import models.income_model
+import models.expense_model
+
+
+def move_batch(connection, after_id, batch_size):
+    """Moves one batch of receipts with ids above ``after_id``; returns (last id, moved, failed)."""
+    rows = connection.execute(
+        select(Receipt.id, Receipt.user_id, Receipt.receipt_image)
+        .where(Receipt.id > after_id, Receipt.image_ref.is_(None),
+               Receipt.receipt_image.like("data:%"))
+        .order_by(Receipt.id)
+        .limit(batch_size)).all()
+    if not rows:
+        return None, 0, 0
+
+    moved, failed, moved_ids = 0, 0, defaultdict(list)
+    for receipt_id, user_id, receipt_image in rows:
+        try:
+            image_ref = store_receipt_image(decode_data_uri(receipt_image))
+        except (ValueError, OSError) as e:
+            failed += 1
+            print(f"receipt {receipt_id}: {e}", file=sys.stderr)
+            continue
+        connection.execute(
+            update(Receipt).where(Receipt.id == receipt_id)
+            .values(image_ref=image_ref, receipt_image=None))
+        moved += 1
+        moved_ids[user_id].append(receipt_id)
+
+    # image_ref changed, so the receipts sync to clients again. Versions
+    # are locked before sequence counters, in the routes' order (see
+    # record_changes), and users in id order.
+    moved_ids = sorted(moved_ids.items())
+    for user_id, _ in moved_ids:
+        connection.execute(bump_statement(connection.dialect.name, user_id, [RECEIPTS]))
+    for user_id, receipt_ids in moved_ids:
+        last_seq = connection.scalar(
+            next_seq_statement(connection.dialect.name, user_id, len(receipt_ids)))
+        connection.execute(supersede_statement(user_id, RECEIPTS, receipt_ids))
+        connection.execute(insert(LedgerChange),
+                           change_rows(user_id, RECEIPTS, receipt_ids, last_seq))
+    return rows[-1][0], moved, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    after_id, moved, failed = 0, 0, 0
+    while True:
+        # One transaction per batch, so progress survives an interruption
+        with engine.begin() as connection:
+            after_id, batch_moved, batch_failed = move_batch(
+                connection, after_id, args.batch_size)
+        if after_id is None:
+            break
+        moved += batch_moved
+        failed += batch_failed
+        print(f"{moved} moved, {failed} failed (up to receipt {after_id})")
+
+    print(f"Done: {moved} moved, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Serialized, memoized rendering of filled tax form PDFs"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from filelock import FileLock
+from scripts.pdfFiller import fill_tax_form_image, generate_pdf_from_images
+
+# Expense categories shown on the form, keyed by the app's category names
+NORMALIZATION_MAP = {
+    "Rent": "Rent",
+    "Rates / Taxes / Charge / Cess": "Tax",
+    "Vehicle Running / Maintenance": "Maintenance",
+    "Travelling": "Traveling",
+    "Electricity": "Electricity",
+    "Water": "Water",
+    "Gas": "Gas",
+    "Telephone": "Telephone",
+    "Asset Insurance / Security": "Insurance",
+    "Medical": "Medical",
+    "Educational": "Educational",
+    "Club": "Club",
+    "Functions / Gatherings": "Functions",
+    "Donation, Zakat, Annuity, Profit on Debt, Life Insurance Premium, etc.": "Donation",
+    "Other Personal / Household Expenses": "Household",
+    "Contribution in Expenses by Family Members": "Contribution"
+}
+FORM_CATEGORIES = list(NORMALIZATION_MAP.values())
+
+
+def form_data(salary_income, expenses):
+    """
+    Builds the values a form is filled with from a user's salary income
+    and their (expense category, total) pairs.
+    """
+    data = {'Salary': int(salary_income), **{cat: 0 for cat in FORM_CATEGORIES}}
+
+    for raw_cat, total in expenses:
+        normalized = NORMALIZATION_MAP.get(raw_cat)
+        if normalized:
+            data[normalized] += int(total)
+
+    total_expenses = sum(data[cat] for cat in FORM_CATEGORIES)
+    data['Remainder'] = int(data['Salary'] - total_expenses)
+    return data
+
+
+def form_digest(data) -> str:
+    """Stable hash of the aggregated values a form is filled with."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class TaxFormRenderer:
+    """
+    Renders tax form PDFs to bytes and remembers the latest one per user,
+    so an unchanged ledger is served without rendering again.
+
+    ``fill_tax_form_image`` and ``generate_pdf_from_images`` work through
+    fixed files on disk, so filling, merging and reading the PDF back run
+    as one critical section, guarded by a thread lock and by a file lock
+    shared with the other worker processes on the host.
+    """
+
+    def __init__(self, lock_path, max_entries=256):
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._file_lock = FileLock(lock_path)
+        self._render_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def render(self, user_id, data) -> bytes:
+        digest = form_digest(data)
+        with self._cache_lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and cached[0] == digest:
+                self._cache.move_to_end(user_id)
+                return cached[1]
+
+        with self._render_lock, self._file_lock:
+            fill_tax_form_image(data)
+            with open(generate_pdf_from_images(), "rb") as f:
+                pdf = f.read()
+
+        if self.max_entries > 0:
+            with self._cache_lock:
+                self._cache[user_id] = (digest, pdf)
+                self._cache.move_to_end(user_id)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return pdf
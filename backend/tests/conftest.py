@@ -0,0 +1,78 @@
+"""
+API test fixtures, backed by a throwaway SQLite database.
+
+The environment is set before any application module is imported, since
+config and database read it at import time. The app runs on SQLite through
+the async engine, so the suite needs aiosqlite as well as pytest and httpx,
+all pinned in requirements.txt. Run from the backend directory:
+    pip install -r requirements.txt
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_data_dir = tempfile.mkdtemp(prefix="taxify-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_data_dir, 'test.sqlite3')}"
+os.environ["RECEIPT_BLOB_DIR"] = os.path.join(_data_dir, "receipt_blobs")
+os.environ["ENABLE_RECEIPT_EXTRACTION"] = "0"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from database import async_engine, engine
+from jwt_handler import get_current_user
+from models.base import Base
+from models.user import User
+from routes import auth, expense, income, receipt, sync
+
+import models.income_model
+import models.expense_model
+import models.receipt_model
+import models.rollup_model
+import models.collection_version_model
+import models.change_feed_model
+
+
+@pytest.fixture(scope="session")
+def app():
+    Base.metadata.create_all(engine)
+    app = FastAPI()
+    app.include_router(auth.router, prefix='/auth')
+    app.include_router(income.router, prefix='/income')
+    app.include_router(expense.router, prefix='/expense')
+    app.include_router(receipt.router, prefix='/receipt')
+    app.include_router(sync.router, prefix='/sync')
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as client:
+        yield client
+        # Pooled aiosqlite connections belong to the client's event loop
+        client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture
+def make_user(app):
+    """Creates a user and returns its id; requests then authenticate as the newest one."""
+    def make_user():
+        email = f"{uuid.uuid4().hex}@example.com"
+        with engine.begin() as connection:
+            user_id = connection.scalar(insert(User).values(
+                email=email, name="Test User", password=b"").returning(User.id))
+        app.dependency_overrides[get_current_user] = lambda: User(
+            id=user_id, email=email, name="Test User")
+        return user_id
+
+    yield make_user
+    app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,23 @@
+"""Taking another user's email is refused, not a server error"""
+
+from sqlalchemy import select
+
+from database import engine
+from models.user import User
+
+
+def email_of(user_id):
+    with engine.connect() as connection:
+        return connection.scalar(select(User.email).where(User.id == user_id))
+
+
+def test_changing_to_a_registered_email_is_refused(client, make_user):
+    taken = email_of(make_user())
+    user_id = make_user()
+    email = email_of(user_id)
+
+    response = client.post("/auth/change_email", json={"new_email": taken})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert email_of(user_id) == email
@@ -0,0 +1,29 @@
+"""A failing batch only fails the requests that caused it"""
+
+import pytest
+
+from models.receipt_batcher import ReceiptBatcher
+
+
+def test_error_in_a_batch_reaches_only_its_request():
+    batches = []
+
+    def batch_fn(images, original_sizes):
+        batches.append(list(images))
+        if "bad" in images:
+            raise ValueError("unreadable receipt")
+        return [image.upper() for image in images]
+
+    batcher = ReceiptBatcher(batch_fn, max_batch_size=3, max_wait_ms=1000)
+    try:
+        # Three images fill a batch, which is then flushed at once
+        futures = [batcher.submit(image) for image in ("good", "bad", "fine")]
+        assert futures[0].result(5) == "GOOD"
+        with pytest.raises(ValueError):
+            futures[1].result(5)
+        assert futures[2].result(5) == "FINE"
+    finally:
+        batcher.close()
+
+    assert batches[0] == ["good", "bad", "fine"]
+    assert batches[1:] == [["good"], ["bad"], ["fine"]]
@@ -0,0 +1,56 @@
+"""get_receipts runs the same number of queries however many receipts it lists"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from database import async_engine, engine
+from models.expense_model import Expense
+from models.receipt_model import Receipt
+
+RECEIPTS = 20
+
+
+def seed_receipts(user_id, count):
+    """Adds ``count`` receipts, every other one attached to an expense."""
+    with engine.begin() as connection:
+        expense_ids = connection.scalars(insert(Expense).returning(Expense.id), [{
+            "user_id": user_id, "date": date(2025, 1, 1) + timedelta(days=number),
+            "expense_category": "Groceries", "total": 100.0, "tax": 5.0,
+        } for number in range(count // 2)]).all()
+        connection.execute(insert(Receipt), [{
+            "user_id": user_id,
+            "expense_id": expense_ids[number // 2] if number % 2 == 0 else None,
+            "date_uploaded": date(2025, 1, 1) + timedelta(days=number) if number % 3 else None,
+            "vendor_name": "Vendor", "total_amount": 100.0,
+        } for number in range(count)])
+
+
+def count_queries(client, params):
+    """Queries run while serving one get_receipts request, and its rows."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get("/receipt/get_receipts", params=params)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("params", [{}, {"limit": RECEIPTS // 2}])
+def test_query_count_does_not_grow_with_receipts(client, make_user, params):
+    seed_receipts(make_user(), RECEIPTS)
+    queries, rows = count_queries(client, params)
+    assert len(rows) == params.get("limit", RECEIPTS)
+
+    seed_receipts(make_user(), 2 * RECEIPTS)
+    queries_for_twice_as_many, rows = count_queries(client, params)
+    assert len(rows) == params.get("limit", 2 * RECEIPTS)
+
+    assert queries_for_twice_as_many == queries
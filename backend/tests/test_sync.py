@@ -0,0 +1,40 @@
+"""Deleting ledger records leaves tombstones in /sync"""
+
+EXPENSE = {"date": "2025-01-15", "expense_category": "Groceries", "total": 100.0, "tax": 5.0}
+
+
+def sync(client, cursor=0):
+    response = client.get("/sync", params={"cursor": cursor})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_deleting_an_expense_tombstones_all_its_receipts(client, make_user):
+    make_user()
+    expense = client.post("/expense/add_expense", json={
+        **EXPENSE, "receipt": {"vendor_name": "Vendor", "total_amount": 100.0}}).json()
+    second = client.post("/receipt/add_receipt", json={
+        "expense_id": expense["id"], "vendor_name": "Vendor", "total_amount": 100.0}).json()
+    synced = sync(client)
+    receipt_ids = sorted(receipt["id"] for receipt in synced["receipts"]["upserted"])
+    assert len(receipt_ids) == 2 and second["id"] in receipt_ids
+
+    assert client.delete(f"/expense/delete_expense/{expense['id']}").status_code == 200
+
+    changes = sync(client, synced["cursor"])
+    assert changes["expenses"]["deleted"] == [expense["id"]]
+    assert sorted(changes["receipts"]["deleted"]) == receipt_ids
+    assert client.get("/receipt/get_receipts").json() == []
+
+
+def test_deleting_an_income_tombstones_it(client, make_user):
+    make_user()
+    income = client.post("/income/add_income", json={
+        "date": "2025-01-15", "income_category": "Salary", "total": 1000.0}).json()
+    synced = sync(client)
+    assert [row["id"] for row in synced["incomes"]["upserted"]] == [income["id"]]
+
+    assert client.delete(f"/income/delete_income/{income['id']}").status_code == 200
+
+    changes = sync(client, synced["cursor"])
+    assert changes["incomes"] == {"upserted": [], "deleted": [income["id"]]}